@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Compares the HTTP transports against a local stand-in for the DNAnexus and
+VarSome Clinical APIs that answers every POST with a small JSON body after a
+fixed latency.
+
+The requests transport is measured against an HTTP/1.1 stand-in and the http2
+transport against an HTTP/2 (h2c, prior knowledge) stand-in, each sending the
+same number of concurrent requests through a single shared session. The report
+lists wall time, throughput, latency percentiles and the number of connections
+the stand-in accepted.
+
+Usage::
+
+    pip install 'httpx[http2]'
+    python benchmarks/transport_benchmark.py --requests 500 --concurrency 32
+"""
+
+import argparse
+import concurrent.futures
+import http.server
+import json
+import socket
+import statistics
+import threading
+import time
+
+from dx_vc_file_transfer.circuit_breaker import CircuitBreakerRegistry
+from dx_vc_file_transfer.http_request import http_session
+
+BODY = json.dumps({"id": "sample-file-1", "url": "https://example.com"}).encode()
+
+
+class _Connections:
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self):
+        with self.lock:
+            self.count += 1
+
+
+def _http1_server(latency: float, connections: _Connections):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            connections.add()
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def _h2_connection(sock: socket.socket, latency: float):
+    import h2.config
+    import h2.connection
+    import h2.events
+
+    conn = h2.connection.H2Connection(
+        h2.config.H2Configuration(client_side=False, validate_inbound_headers=False)
+    )
+    lock = threading.Lock()
+    conn.initiate_connection()
+    sock.sendall(conn.data_to_send())
+
+    def respond(stream_id):
+        time.sleep(latency)
+        with lock:
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", "200"),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(BODY))),
+                ],
+            )
+            conn.send_data(stream_id, BODY, end_stream=True)
+            sock.sendall(conn.data_to_send())
+
+    while data := sock.recv(65535):
+        with lock:
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    threading.Thread(
+                        target=respond, args=(event.stream_id,), daemon=True
+                    ).start()
+            sock.sendall(conn.data_to_send())
+
+
+def _h2_server(latency: float, connections: _Connections):
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        while True:
+            sock, _ = listener.accept()
+            connections.add()
+            threading.Thread(
+                target=_h2_connection, args=(sock, latency), daemon=True
+            ).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def _run(session, url: str, requests: int, concurrency: int):
+    def call(_):
+        start = time.perf_counter()
+        response = session.post(url, json={"file_url": "https://example.com/f"})
+        response.raise_for_status()
+        response.json()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(call, range(requests)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Stand-in latency in seconds"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'transport':10} {'wall s':>8} {'req/s':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'conns':>6}"
+    )
+    for transport, server in (("requests", _http1_server), ("http2", _h2_server)):
+        connections = _Connections()
+        port = server(args.latency, connections)
+        if transport == "http2":
+            from dx_vc_file_transfer.http2 import HTTP2Session
+
+            # Plain http:// URLs have no ALPN, talk HTTP/2 with prior knowledge.
+            session = HTTP2Session(
+                {"Authorization": "Bearer token"},
+                circuit_breakers=CircuitBreakerRegistry(),
+                http1=False,
+            )
+        else:
+            session = http_session("token", breakers=CircuitBreakerRegistry())
+        url = f"http://127.0.0.1:{port}/api/v1/sample-files/"
+        try:
+            _run(session, url, args.concurrency, args.concurrency)
+            wall, latencies = _run(session, url, args.requests, args.concurrency)
+        finally:
+            session.close()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{transport:10} {wall:8.2f} {args.requests / wall:8.0f} "
+            f"{statistics.median(latencies) * 1000:8.1f} {p95 * 1000:8.1f} "
+            f"{connections.count:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of requests to a single host. After
+    ``failure_threshold`` consecutive failures the circuit opens and requests
+    are rejected without being sent. Once ``recovery_timeout`` seconds have
+    passed a single probe request is let through: the circuit closes if it
+    succeeds and opens again if it fails.
+
+    :param host: The host the breaker guards.
+    :type host: str
+    :param failure_threshold: Consecutive failures opening the circuit.
+    :type failure_threshold: int
+    :param recovery_timeout: Seconds the circuit stays open before probing.
+    :type recovery_timeout: float
+    :param clock: Monotonic clock returning seconds.
+    :type clock: Callable[[], float]
+    """
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Returns whether a request to the host may be sent, counting rejected
+        requests. Moves an open circuit to half open once the recovery timeout
+        has passed, letting a single probe request through.
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if (
+                self.state == STATE_OPEN
+                and self.clock() - self._opened_at >= self.recovery_timeout
+            ):
+                self.state = STATE_HALF_OPEN
+                self._probing = False
+                logger.info("Circuit for host %s half open, probing", self.host)
+            if self.state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info("Circuit for host %s closed", self.host)
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN or (
+                self.state == STATE_CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = STATE_OPEN
+                self.opened += 1
+                self._opened_at = self.clock()
+                self._probing = False
+                logger.warning(
+                    "Circuit for host %s opened after %d consecutive failures, "
+                    "failing fast for %.0f seconds",
+                    self.host,
+                    self.failures,
+                    self.recovery_timeout,
+                )
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == STATE_OPEN
+
+
+class CircuitBreakerRegistry:
+    """
+    Holds one circuit breaker per host, created on first use.
+
+    :param failure_threshold: Consecutive failures opening a circuit.
+    :type failure_threshold: int
+    :param recovery_timeout: Seconds a circuit stays open before probing.
+    :type recovery_timeout: float
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    host,
+                    failure_threshold=self.failure_threshold,
+                    recovery_timeout=self.recovery_timeout,
+                )
+            return self._breakers[host]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns the state and counters of the breaker of each host.
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {
+            breaker.host: {
+                "state": breaker.state,
+                "failures": breaker.failures,
+                "opened": breaker.opened,
+                "rejected": breaker.rejected,
+            }
+            for breaker in breakers
+        }
+
+
+circuit_breakers = CircuitBreakerRegistry()
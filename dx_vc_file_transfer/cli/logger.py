@@ -1,17 +1,162 @@
+import contextlib
+import copy
+import json
 import logging
+import queue
+import threading
+import time
+from typing import Iterator
+
+LOG_FORMATS = ("text", "json")
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+_FORMATTER = logging.Formatter()
+# Attributes of every log record, the others were passed with extra=.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a log record as a single line JSON object holding the time,
+    level, logger and message, along with the fields passed with ``extra=``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Lets through the given fraction of the debug records, evenly spread, and
+    all records of higher levels. Keeps per file debug events cheap when
+    transferring many files.
+
+    :param rate: The fraction of debug records let through, between 0 and 1.
+    :type rate: float
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        # Integer credits in millionths, as adding up float rates drifts.
+        self._step = round(rate * 1_000_000)
+        self._credit = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        with self._lock:
+            self._credit += self._step
+            if self._credit < 1_000_000:
+                return False
+            self._credit -= 1_000_000
+            return True
 
 
 def _get_logger():
     """
-    Returns a logger instance for the dx_vc_file_transfer module.
+    Returns a logger instance for the dx_vc_file_transfer module, adding its
+    handler only once.
     """
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     logger = logging.getLogger("dx_vc_file_transfer")
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
     return logger
 
 
+class _QueueHandler(logging.Handler):
+    """
+    Puts the records on a queue with their message formatted, keeping the
+    traceback of exceptions apart from the message for the formatters of
+    the listener. Same as ``logging.handlers.QueueHandler``, which is not
+    imported before the arguments are parsed.
+
+    :param records: The queue the records are put on.
+    :type records: queue.SimpleQueue
+    """
+
+    def __init__(self, records: queue.SimpleQueue):
+        super().__init__()
+        self.queue = records
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _FORMATTER.formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+@contextlib.contextmanager
+def configure_logging(
+    log_format: str = "text", level: str = "INFO", debug_sample_rate: float = 1.0
+) -> Iterator[logging.Logger]:
+    """
+    Logs through a queue for the duration of the block, so that logging
+    calls return without waiting on the stream. A background thread formats
+    the records and writes them to stderr, the records still queued are
+    written on exit.
+
+    :param log_format: Either "text" or "json" for JSON lines.
+    :type log_format: str
+    :param level: The minimum level of the logged records.
+    :type level: str
+    :param debug_sample_rate: The fraction of debug records logged.
+    :type debug_sample_rate: float
+    """
+    # Imported here as it is only needed once the arguments are parsed.
+    import logging.handlers
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        JSONFormatter() if log_format == "json" else logging.Formatter(_TEXT_FORMAT)
+    )
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+    listener = logging.handlers.QueueListener(records, handler)
+
+    previous_handlers, previous_level = logger.handlers[:], logger.level
+    logger.handlers = [queue_handler]
+    logger.setLevel(level)
+    listener.start()
+    try:
+        yield logger
+    finally:
+        listener.stop()
+        logger.handlers = previous_handlers
+        logger.setLevel(previous_level)
+
+
 logger = _get_logger()
@@ -0,0 +1,263 @@
+import collections
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from typing import Counter, Iterator, List, Optional, Tuple
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+# Before Python 3.12 a cProfile profile only sees the thread that enabled it,
+# since 3.12 it is built on sys.monitoring and sees every thread.
+_PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+_TRACEMALLOC_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# Functions in which threads wait idle for work, such as the pool workers and
+# the log listener, left out of the top sampled functions.
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    (os.path.join("concurrent", "futures", "thread.py"), "_worker"),
+    (os.path.join("logging", "handlers.py"), "dequeue"),
+}
+
+
+def _is_idle(frame: str) -> bool:
+    """
+    Returns whether a sampled frame, formatted as ``name (file:line)``, is a
+    thread waiting idle for work.
+    """
+    function, _, location = frame.partition(" (")
+    file_name = location.rpartition(":")[0]
+    return any(
+        function == name and file_name.endswith(os.sep + suffix)
+        for suffix, name in _IDLE_FRAMES
+    )
+
+
+class _StackSampler(threading.Thread):
+    """
+    Low overhead statistical profiler. Periodically samples the stacks of
+    all other threads and counts identical stacks, rooted at the thread name.
+
+    :param interval: Seconds between two samples.
+    :type interval: float
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="dx-vc-profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter[Tuple[str, ...]] = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                if stack:
+                    stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                    self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Records a CPU profile of all threads and ``tracemalloc`` allocation
+    snapshots at phase boundaries, writing them together with a text report
+    to an output directory. Threads still running when the profiler stops
+    are profiled up to that point.
+
+    :param output_dir: Directory the profile artifacts are written to.
+    :type output_dir: str
+    :param mode: ``cprofile`` for deterministic profiling or ``sampling`` for
+        periodic stack sampling with lower overhead.
+    :type mode: str
+    :param sample_interval: Seconds between two samples in sampling mode.
+    :type sample_interval: float
+    :param top: Number of entries listed in each section of the report.
+    :type top: int
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        mode: str = "cprofile",
+        sample_interval: float = 0.005,
+        top: int = 25,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.top = top
+        self.snapshots: List[Tuple[str, tracemalloc.Snapshot]] = []
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._profiling_threads = False
+        self._sampler: Optional[_StackSampler] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start()
+        self.phase("start")
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            if _PER_THREAD_CPROFILE:
+                self._profiling_threads = True
+                threading.setprofile(self._profile_thread)
+        else:
+            self._sampler = _StackSampler(self.sample_interval)
+            self._sampler.start()
+
+    def _profile_thread(self, frame, event, arg):
+        """
+        Profile function installed in threads started while profiling,
+        replacing itself with a cProfile profile of the thread.
+        """
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            if not self._profiling_threads:
+                return
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def phase(self, name: str):
+        """
+        Takes an allocation snapshot marking the end of a phase.
+
+        :param name: The name of the phase boundary.
+        :type name: str
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+        snapshot.dump(self._path(f"{len(self.snapshots):02d}-{name}.tracemalloc"))
+        self.snapshots.append((name, snapshot))
+
+    def stop(self):
+        if self._profile is not None:
+            threading.setprofile(None)
+            with self._lock:
+                self._profiling_threads = False
+            self._profile.disable()
+            self._cpu_stats().dump_stats(self._path("cpu.prof"))
+        if self._sampler is not None:
+            self._sampler.stop()
+            with open(self._path("cpu.folded"), "w", encoding="utf-8") as fp:
+                for stack, count in self._sampler.stacks.most_common():
+                    fp.write(f"{';'.join(stack)} {count}\n")
+        self.phase("end")
+        tracemalloc.stop()
+        with open(self._path("report.txt"), "w", encoding="utf-8") as fp:
+            fp.write(self.report())
+
+    def report(self) -> str:
+        """
+        Returns a text report of the top functions and allocation sites.
+        """
+        out = io.StringIO()
+        if self._profile is not None:
+            for sort_key in ("cumulative", "tottime"):
+                out.write(f"== Top functions by {sort_key} time ==\n")
+                stats = self._cpu_stats(out)
+                stats.sort_stats(sort_key).print_stats(self.top)
+        if self._sampler is not None:
+            leaves: Counter[str] = collections.Counter()
+            idle = 0
+            for stack, count in self._sampler.stacks.items():
+                if _is_idle(stack[-1]):
+                    idle += count
+                else:
+                    leaves[stack[-1]] += count
+            total = sum(leaves.values())
+            out.write(
+                f"== Top functions by samples ({total} samples, "
+                f"{idle} idle samples left out) ==\n"
+            )
+            for function, count in leaves.most_common(self.top):
+                out.write(f"{count / total:7.2%} {count:8d}  {function}\n")
+            out.write("\n")
+        for (_, previous), (name, snapshot) in zip(self.snapshots, self.snapshots[1:]):
+            out.write(f"== Top allocation growth up to {name} ==\n")
+            for stat in snapshot.compare_to(previous, "lineno")[: self.top]:
+                out.write(f"{stat}\n")
+            out.write("\n")
+        if self.snapshots:
+            name, snapshot = self.snapshots[-1]
+            out.write(f"== Top allocation sites at {name} ==\n")
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def _cpu_stats(self, stream: Optional[io.TextIOBase] = None) -> pstats.Stats:
+        """
+        Returns the cProfile statistics of all profiled threads.
+        """
+        with self._lock:
+            thread_profiles = list(self._thread_profiles)
+        stats = pstats.Stats(self._profile, stream=stream)
+        for profile in thread_profiles:
+            stats.add(profile)
+        return stats
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.output_dir, file_name)
+
+
+_active: Optional[Profiler] = None
+
+
+@contextlib.contextmanager
+def profile(profiler: Optional[Profiler]) -> Iterator[Optional[Profiler]]:
+    """
+    Runs the enclosed block under the given profiler. Does nothing if no
+    profiler is given.
+    """
+    global _active
+    if profiler is None:
+        yield None
+        return
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = None
+
+
+def mark_phase(name: str):
+    """
+    Marks a phase boundary on the active profiler, if any.
+
+    :param name: The name of the phase boundary.
+    :type name: str
+    """
+    if _active is not None:
+        _active.phase(name)
@@ -1,29 +1,370 @@
 #!/usr/bin/env python3
 import argparse
+import os
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from requests import ConnectTimeout, HTTPError, ReadTimeout
-
+from dx_vc_file_transfer import tracing
+from dx_vc_file_transfer.circuit_breaker import circuit_breakers
+from dx_vc_file_transfer.cli import profiling
 from dx_vc_file_transfer.cli.config import Config
-from dx_vc_file_transfer.cli.logger import logger
-from dx_vc_file_transfer.dnanexus import DNANexusClient
-from dx_vc_file_transfer.varsome import VarSomeClinicalClient
+from dx_vc_file_transfer.cli.logger import (
+    LOG_FORMATS,
+    LOG_LEVELS,
+    configure_logging,
+    logger,
+)
+from dx_vc_file_transfer.dedup import DEFAULT_CHECKSUM_PROPERTIES, deduplicate
+from dx_vc_file_transfer.results import (
+    RESULT_FORMATS,
+    STATUS_DUPLICATE,
+    STATUS_FAILED,
+    STATUS_SUBMITTED,
+    ResultSink,
+    TransferResult,
+    open_result_sink,
+)
+
+if TYPE_CHECKING:
+    import requests
+
+    from dx_vc_file_transfer.dnanexus import DNANexusClient, DXFile
+    from dx_vc_file_transfer.grouping import SampleGroup, SampleTracker
+    from dx_vc_file_transfer.hedging import Hedger
+    from dx_vc_file_transfer.routing import Route
+    from dx_vc_file_transfer.varsome import VarSomeClinicalClient
+
+
+def _split_folder(dx_project_id: str, folder: str) -> Tuple[str, str]:
+    """
+    Splits a folder given as "project-xxxx:/path" into its project ID and
+    path, using the default project for folders given as a plain path.
+    """
+    if folder.startswith("project-") and ":" in folder:
+        project_id, _, folder = folder.partition(":")
+        return project_id, folder
+    return dx_project_id, folder
+
+
+def _list_files(
+    dx_client: "DNANexusClient",
+    dx_project_id: str,
+    folders: List[str],
+    dx_session: "requests.Session",
+) -> List["DXFile"]:
+    """
+    List the files having accepted extensions in each of the folders.
+    """
+    files = []
+    for folder in folders:
+        project_id, folder = _split_folder(dx_project_id, folder)
+        logger.info(
+            "Initiating transfer of files in project %s folder %s", project_id, folder
+        )
+        if folder_files := dx_client.files_in_project_folder(
+            project_id, folder, dx_session
+        ):
+            files.extend(folder_files)
+            continue
+        logger.warning(
+            "No files in project %s folder %s found to be transferred",
+            project_id,
+            folder,
+        )
+    return files
+
+
+def _find_files(
+    dx_client: "DNANexusClient",
+    projects: Optional[List[str]],
+    tags: Sequence[str],
+    properties: Dict[str, Any],
+    dx_session: "requests.Session",
+) -> List["DXFile"]:
+    """
+    Find the files having accepted extensions, the tags and the properties
+    in the projects.
+    """
+    logger.info(
+        "Initiating transfer of files with tags %s and properties %s in %s",
+        list(tags),
+        properties,
+        f"projects {', '.join(projects)}" if projects else "all accessible projects",
+    )
+    files = dx_client.find_files(projects, tags, properties, dx_session)
+    if not files:
+        logger.warning(
+            "No files with tags %s and properties %s found to be transferred",
+            list(tags),
+            properties,
+        )
+    return files
+
+
+def _parse_properties(values: Sequence[str]) -> Dict[str, Any]:
+    """
+    Parses properties given as "key=value", or as "key" to match any value.
+    """
+    properties: Dict[str, Any] = {}
+    for value in values:
+        key, sep, value = value.partition("=")
+        properties[key.strip()] = value.strip() if sep else True
+    return properties
+
+
+def _route_name(
+    routes: Optional[List["Route"]],
+) -> Optional[Callable[["DXFile"], Optional[str]]]:
+    """
+    Returns a function giving the name of the route a file is submitted
+    through, or None when not routing files.
+    """
+    if not routes:
+        return None
+    from dx_vc_file_transfer.routing import match_route
+
+    def route_name(file: "DXFile") -> Optional[str]:
+        route = match_route(file, routes)
+        return route.name if route is not None else None
+
+    return route_name
+
+
+def _submit_routed(
+    dx_client: "DNANexusClient",
+    targets: List[Tuple["Route", "VarSomeClinicalClient"]],
+    files: List["DXFile"],
+) -> Iterator[TransferResult]:
+    """
+    Route the files to the VarSome Clinical instances and submit them to all
+    instances concurrently, each instance one file at a time with its own
+    DNAnexus session. Files matching no route are recorded as failed, as are
+    the remaining files of a route whose instance becomes unavailable.
+    """
+    from requests import ConnectionError, Timeout
+
+    from dx_vc_file_transfer.routing import merge_results, route_files
+
+    routed, unrouted = route_files(files, [route for route, _ in targets])
+    for route, _ in targets:
+        logger.info(
+            "Routing %d files to %s (%s)",
+            len(routed[route.name]),
+            route.name,
+            route.base_url,
+        )
+    if unrouted:
+        logger.warning("No route matches %d files", len(unrouted))
+    for file in unrouted:
+        yield TransferResult.for_file(
+            file, status=STATUS_FAILED, error="No matching route"
+        )
+
+    def submission(route: "Route", vclin_client: "VarSomeClinicalClient"):
+        files = routed[route.name]
+        minting_failed = False
+
+        def minted(session: "requests.Session") -> Iterator["DXFile"]:
+            nonlocal minting_failed
+            try:
+                yield from dx_client.iter_download_urls(files, session)
+            except Exception:
+                minting_failed = True
+                raise
+
+        def submit() -> Iterator[TransferResult]:
+            submitted = 0
+            with dx_client.client() as session:
+                try:
+                    for result in vclin_client.submit_files(minted(session)):
+                        submitted += 1
+                        result.target = route.name
+                        yield result
+                except (ConnectionError, Timeout) as e:
+                    # DNAnexus errors concern every route and stop the run.
+                    if minting_failed:
+                        raise
+                    logger.error(
+                        "Host unavailable, stopped submitting %d files to %s %s",
+                        len(files) - submitted,
+                        route.name,
+                        e,
+                    )
+                    for file in files[submitted:]:
+                        yield TransferResult.for_file(
+                            file, status=STATUS_FAILED, error=str(e), target=route.name
+                        )
+
+        return submit
+
+    yield from merge_results(
+        [
+            submission(route, vclin_client)
+            for route, vclin_client in targets
+            if routed[route.name]
+        ]
+    )
+
+
+def _submit_files(
+    dx_client: "DNANexusClient",
+    vclin_client: "VarSomeClinicalClient",
+    files: List["DXFile"],
+    dx_session: "requests.Session",
+    sink: ResultSink,
+    aliases: Optional[Dict[str, List["DXFile"]]] = None,
+    targets: Optional[List[Tuple["Route", "VarSomeClinicalClient"]]] = None,
+    samples: Optional["SampleTracker"] = None,
+):
+    """
+    Mint download URLs for the files and submit them to VarSome Clinical one
+    at a time, or to the instances of the routes when routing files, writing
+    each outcome to the result sink as it completes. Duplicates of a file are
+    recorded right after the file itself.
+    """
+    aliases = aliases or {}
+    if targets:
+        results = _submit_routed(dx_client, targets, files)
+    else:
+        results = vclin_client.submit_files(
+            dx_client.iter_download_urls(files, dx_session)
+        )
+    for result in results:
+        if samples is not None and (ready_after := samples.record(result)) is not None:
+            logger.info(
+                "Sample %s ready for analysis after %.1f seconds",
+                result.sample,
+                ready_after,
+                extra={"sample": result.sample, "ready_after": ready_after},
+            )
+        sink.write(result)
+        if result.status == STATUS_FAILED:
+            logger.error(
+                "Failed to submit file %s (%s) %s",
+                result.file_name,
+                result.file_id,
+                result.error,
+            )
+        else:
+            logger.debug(
+                "Submitted file %s (%s) as sample file %s",
+                result.file_name,
+                result.file_id,
+                result.sample_file_id,
+                extra={
+                    "file_id": result.file_id,
+                    "sample_file_id": result.sample_file_id,
+                    "mint_latency": result.mint_latency,
+                    "submit_latency": result.submit_latency,
+                },
+            )
+        for alias in aliases.get(result.file_id, ()):
+            sink.write(
+                TransferResult.for_file(
+                    alias,
+                    status=STATUS_DUPLICATE,
+                    alias_of=result.file_id,
+                    sample_file_id=result.sample_file_id,
+                    target=result.target,
+                )
+            )
+    logger.info(
+        "Submitted %d files to VarSome Clinical, %d failed, %d duplicates skipped",
+        sink.counts[STATUS_SUBMITTED],
+        sink.counts[STATUS_FAILED],
+        sink.counts[STATUS_DUPLICATE],
+    )
+    if samples is not None:
+        _log_samples(samples)
+
+
+def _group_samples(
+    files: List["DXFile"],
+    sample_pattern: Optional[str],
+    sample_property: Optional[str],
+    paired_reads: bool = True,
+) -> List["SampleGroup"]:
+    """
+    Group the files by sample, logging the samples missing mates or lanes.
+    """
+    from dx_vc_file_transfer.grouping import group_samples
+
+    groups = group_samples(files, sample_pattern, sample_property, paired_reads)
+    incomplete = [group for group in groups if not group.complete]
+    logger.info(
+        "Grouped %d files into %d samples, %d incomplete",
+        len(files),
+        len(groups),
+        len(incomplete),
+    )
+    for group in incomplete:
+        logger.warning(
+            "Sample %s is incomplete, missing %s, submitting it last",
+            group.sample,
+            ", ".join(group.missing),
+        )
+    return groups
+
+
+def _log_samples(samples: "SampleTracker"):
+    """
+    Logs how many samples are ready for analysis and how long it took.
+    """
+    summary = samples.summary()
+    if summary["ready"]:
+        logger.info(
+            "%d of %d samples ready for analysis, after %.1f seconds median "
+            "and %.1f seconds at most",
+            summary["ready"],
+            summary["samples"],
+            summary["median_ready_after"],
+            summary["max_ready_after"],
+        )
+    if summary["failed"]:
+        logger.warning("%d samples have files that failed", summary["failed"])
 
 
 def _transfer_files(
     dx_project_id: str,
-    folder: str,
+    folders: List[str],
     vclin_base_url: str,
     dx_base_url: str,
     accepted_file_extensions: list,
     download_expiration: int,
+    results_file: Optional[str] = None,
+    results_format: str = "jsonl",
+    dedup: bool = False,
+    checksum_properties: Sequence[str] = DEFAULT_CHECKSUM_PROPERTIES,
+    http_transport: str = "requests",
+    hedge_budget: Optional[float] = None,
+    tags: Sequence[str] = (),
+    properties: Optional[Dict[str, Any]] = None,
+    query_projects: Optional[List[str]] = None,
+    routes: Optional[List["Route"]] = None,
+    group_by_sample: bool = False,
+    sample_pattern: Optional[str] = None,
+    sample_property: Optional[str] = None,
+    max_response_size: Optional[int] = None,
+    paired_reads: bool = True,
 ):
     """
     Transfer files from a DNAnexus project to VarSome Clinical.
 
     :param dx_project_id: The ID of the DNAnexus project.
     :type str
-    :param folder: The folder path within the project.
-    :type str
+    :param folders: The folder paths within the project, a folder given as
+        "project-xxxx:/path" is listed in that project instead.
+    :type List[str]
     :param vclin_base_url: VarSome Clinical base URL.
     :type str
     :param dx_base_url: DNAnexus base URL.
@@ -32,44 +373,191 @@ def _transfer_files(
     :type list
     :param download_expiration: Download expiration time in seconds.
     :type int
+    :param results_file: File the outcome of each file is written to,
+        "-" for stdout.
+    :type Optional[str]
+    :param results_format: Either "jsonl" or "csv".
+    :type str
+    :param dedup: Submit only one of the files having the same content
+        fingerprint, recording the others as duplicates.
+    :type bool
+    :param checksum_properties: Names of the file properties holding a
+        content checksum used as fingerprint.
+    :type Sequence[str]
+    :param http_transport: Either "requests" or "http2".
+    :type str
+    :param hedge_budget: Hedge slow DNAnexus calls with a duplicate call,
+        up to this fraction of the calls. None disables hedging.
+    :type Optional[float]
+    :param tags: Find the files having all these tags instead of listing the
+        folders.
+    :type Sequence[str]
+    :param properties: Find the files having all these properties instead of
+        listing the folders, a value of True matching any value.
+    :type Optional[Dict[str, Any]]
+    :param query_projects: The projects searched for files having the tags
+        and properties, None to search all accessible projects.
+    :type Optional[List[str]]
+    :param routes: Submit each file to the VarSome Clinical instance of the
+        first route it matches instead of to vclin_base_url.
+    :type Optional[List[Route]]
+    :param group_by_sample: Submit the files of each sample together, the
+        complete samples first.
+    :type bool
+    :param sample_pattern: Regular expression capturing the sample, lane and
+        read from file names, defaults to Illumina style FASTQ names.
+    :type Optional[str]
+    :param sample_property: The file property holding the sample, used
+        before the sample_pattern.
+    :type Optional[str]
+    :param max_response_size: The maximum size in bytes of an API response,
+        defaults to DEFAULT_MAX_RESPONSE_SIZE.
+    :type Optional[int]
+    :param paired_reads: Whether samples have paired end reads, so that a
+        lane missing a mate makes a sample incomplete.
+    :type bool
     """
+    # Imported here so that the CLI starts without loading requests,
+    # keeping --help and argument errors fast.
+    from requests import ConnectTimeout, HTTPError, ReadTimeout
+
+    from dx_vc_file_transfer.codec import (
+        DEFAULT_MAX_RESPONSE_SIZE,
+        ResponseTooLargeError,
+    )
+    from dx_vc_file_transfer.dnanexus import DNANexusClient
+    from dx_vc_file_transfer.grouping import SampleTracker
+    from dx_vc_file_transfer.hedging import Hedger
+    from dx_vc_file_transfer.http_request import CircuitOpenError
+    from dx_vc_file_transfer.rate_limit import RateLimiter
+    from dx_vc_file_transfer.varsome import VarSomeClinicalClient
 
     config = Config.from_env()
+    if max_response_size is None:
+        max_response_size = DEFAULT_MAX_RESPONSE_SIZE
+    hedger = Hedger(budget=hedge_budget) if hedge_budget else None
     dx_client = DNANexusClient(
         dx_api_token=config.dx_api_token,
         dx_base_url=dx_base_url,
         download_expiration=download_expiration,
         accepted_file_extensions=accepted_file_extensions,
+        http_transport=http_transport,
+        hedger=hedger,
+        max_response_size=max_response_size,
     )
     vclin_client = VarSomeClinicalClient(
         clinical_api_token=config.vclin_api_token,
         clinical_base_url=vclin_base_url,
+        http_transport=http_transport,
+        max_response_size=max_response_size,
     )
+    targets = [
+        (
+            route,
+            VarSomeClinicalClient(
+                clinical_api_token=os.getenv(route.token_env),
+                clinical_base_url=route.base_url,
+                http_transport=http_transport,
+                rate_limiter=RateLimiter(route.max_rate) if route.max_rate else None,
+                max_response_size=max_response_size,
+            ),
+        )
+        for route in routes or []
+    ]
+    with tracing.span(
+        "transfer_files", **{"dx.project_id": dx_project_id, "dx.folders": folders}
+    ) as span:
+        try:
+            with dx_client.client() as dx_session:
+                if tags or properties:
+                    files = _find_files(
+                        dx_client, query_projects, tags, properties or {}, dx_session
+                    )
+                else:
+                    files = _list_files(dx_client, dx_project_id, folders, dx_session)
+                if not files:
+                    return
+                profiling.mark_phase("files_listed")
+                logger.info(
+                    "Retrieved %d files to transfer to VarSome Clinical", len(files)
+                )
+                aliases = None
+                if dedup:
+                    # Copies routed to different instances are submitted to each.
+                    files, aliases = deduplicate(
+                        files, checksum_properties, _route_name(routes)
+                    )
+                    logger.info(
+                        "Deduplicated to %d files with distinct content", len(files)
+                    )
+                samples = None
+                if group_by_sample:
+                    groups = _group_samples(
+                        files, sample_pattern, sample_property, paired_reads
+                    )
+                    files = [file for group in groups for file in group.files]
+                    samples = SampleTracker(groups)
+                with open_result_sink(results_file, results_format) as sink:
+                    _submit_files(
+                        dx_client,
+                        vclin_client,
+                        files,
+                        dx_session,
+                        sink,
+                        aliases,
+                        targets,
+                        samples,
+                    )
+            profiling.mark_phase("files_submitted")
+            logger.info("Process to initiate file transfer completed")
+        except CircuitOpenError as e:
+            span.record_exception(e)
+            logger.error("Host unavailable, stopped transferring files %s", e)
+        except ResponseTooLargeError as e:
+            span.record_exception(e)
+            logger.error("Response too large, stopped transferring files %s", e)
+        except HTTPError as e:
+            span.record_exception(e)
+            logger.error("Failed to transfer files %s", e)
+        except ConnectTimeout as e:
+            span.record_exception(e)
+            logger.error("Timeout error while trying to transfer files %s", e)
+        except ReadTimeout as e:
+            span.record_exception(e)
+            logger.error("Read timeout error while trying to transfer files %s", e)
+        _log_circuit_breakers()
+        _log_hedger(hedger)
+
+
+def _log_circuit_breakers():
+    """
+    Logs the hosts whose circuit opened during the run.
+    """
+    for host, stats in circuit_breakers.snapshot().items():
+        if stats["opened"]:
+            logger.warning(
+                "Circuit for host %s opened %d times and rejected %d requests, "
+                "ending %s",
+                host,
+                stats["opened"],
+                stats["rejected"],
+                stats["state"],
+            )
+
+
+def _log_hedger(hedger: Optional["Hedger"]):
+    """
+    Logs how many DNAnexus calls were hedged and shuts the hedger down.
+    """
+    if hedger is None:
+        return
     logger.info(
-        "Initiating transfer of files in project %s folder %s", dx_project_id, folder
+        "Hedged %d of %d DNAnexus calls, %d hedges answered first",
+        hedger.hedges,
+        hedger.calls,
+        hedger.hedges_won,
     )
-    try:
-        if file_urls_names := dx_client.files_download_urls_in_project_folder(
-            dx_project_id, folder
-        ):
-            logger.info(
-                "Retrieved %d files to transfer to VarSome Clinical",
-                len(file_urls_names),
-            )
-            vclin_client.retrieve_external_files(file_urls_names)
-            logger.info("Process to initiate file transfer completed")
-            return
-        logger.warning(
-            "No files in project %s folder %s found to be transferred",
-            dx_project_id,
-            folder,
-        )
-    except HTTPError as e:
-        logger.error("Failed to transfer files %s", e)
-    except ConnectTimeout as e:
-        logger.error("Timeout error while trying to transfer files %s", e)
-    except ReadTimeout as e:
-        logger.error("Read timeout error while trying to transfer files %s", e)
+    hedger.close()
 
 
 def main():
@@ -78,7 +566,30 @@ def main():
     )
     parser.add_argument("--dx-project-id", required=True, help="DNAnexus project ID")
     parser.add_argument(
-        "--folder", required=True, help="Folder path within the project"
+        "--folder",
+        action="append",
+        help="Folder path within the project, can be repeated and given as "
+        "project-xxxx:/path to list a folder of another project",
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        help="Transfer the closed files having this tag instead of the files of "
+        "folders, can be repeated to require several tags",
+    )
+    parser.add_argument(
+        "--property",
+        action="append",
+        metavar="KEY=VALUE",
+        help="Transfer the closed files having this property instead of the files "
+        "of folders, given as KEY to match any value, can be repeated",
+    )
+    parser.add_argument(
+        "--query-projects",
+        default=None,
+        help="Comma-separated list of projects searched by --tag and --property, "
+        "or all to search all accessible projects (default: the --dx-project-id "
+        "project)",
     )
     parser.add_argument(
         "--vclin-base-url",
@@ -90,6 +601,13 @@ def main():
         default="https://api.dnanexus.com",
         help="DNAnexus base URL (default: %(default)s)",
     )
+    parser.add_argument(
+        "--routes",
+        default=None,
+        metavar="ROUTES_FILE",
+        help="JSON file of rules routing files to several VarSome Clinical "
+        "instances, replacing --vclin-base-url (default: no routing)",
+    )
     parser.add_argument(
         "--accepted-file-extensions",
         default=".vcf,.vcf.gz,.fastq.gz",
@@ -101,17 +619,210 @@ def main():
         default=86400,
         help="Download expiration time in seconds (default: %(default)s)",
     )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Submit only one file per content fingerprint (checksum property, "
+        "else name and size) and record the others as duplicates",
+    )
+    parser.add_argument(
+        "--checksum-properties",
+        default=",".join(DEFAULT_CHECKSUM_PROPERTIES),
+        help="Comma-separated list of DNAnexus file properties holding a content "
+        "checksum, used by --dedup (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--group-samples",
+        action="store_true",
+        help="Submit the paired reads and lanes of each sample together, complete "
+        "samples first, and report when each sample is ready for analysis",
+    )
+    parser.add_argument(
+        "--sample-pattern",
+        default=None,
+        help="Regular expression capturing the sample and optionally the lane "
+        "and read from file names as named groups, used by --group-samples "
+        "(default: Illumina style names such as S1_L001_R1_001.fastq.gz)",
+    )
+    parser.add_argument(
+        "--sample-property",
+        default=None,
+        help="DNAnexus file property holding the sample, used by --group-samples "
+        "before --sample-pattern (default: none)",
+    )
+    parser.add_argument(
+        "--single-end",
+        action="store_true",
+        help="Samples have single end reads, so that only missing lanes make a "
+        "sample incomplete (default: paired end reads)",
+    )
+    parser.add_argument(
+        "--http-transport",
+        choices=("requests", "http2"),
+        default="requests",
+        help="HTTP transport, http2 multiplexes requests over HTTP/2 connections "
+        "and requires httpx[http2] (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--circuit-failure-threshold",
+        type=int,
+        default=5,
+        help="Consecutive failed requests to a host after which requests to it "
+        "fail fast (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--circuit-recovery-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds requests to a failing host fail fast before a probe "
+        "request is sent (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=None,
+        metavar="FRACTION",
+        help="Send a duplicate of DNAnexus listFolder and download calls slower "
+        "than the recent p95 latency, for at most this fraction of the calls, "
+        "e.g. 0.05 (default: hedging disabled)",
+    )
+    parser.add_argument(
+        "--max-response-size",
+        type=int,
+        default=256,
+        metavar="MIB",
+        help="Stop with an error on DNAnexus or VarSome Clinical responses larger "
+        "than this many MiB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--results-file",
+        default=None,
+        help="Stream the outcome of each file to this file as it completes, "
+        "use - for stdout (default: results are only logged)",
+    )
+    parser.add_argument(
+        "--results-format",
+        choices=RESULT_FORMATS,
+        default="jsonl",
+        help="Format of the results file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="Log as text or as JSON lines (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default="INFO",
+        help="Minimum level of the logged messages (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--log-sample-rate",
+        type=float,
+        default=0.1,
+        help="Fraction of the per file debug messages logged (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Write per request tracing spans to this file in the OTLP/JSON "
+        "format, one export request per line (default: tracing disabled)",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="OUTPUT_DIR",
+        help="Profile the run and write CPU profiles of all threads, allocation "
+        "snapshots and a text report to this directory (default: profiling "
+        "disabled)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=profiling.PROFILE_MODES,
+        default="cprofile",
+        help="Deterministic cProfile profiling or low overhead stack sampling "
+        "(default: %(default)s)",
+    )
     args = parser.parse_args()
+    if not args.folder and not (args.tag or args.property):
+        parser.error("one of --folder, --tag or --property is required")
+    if args.folder and (args.tag or args.property):
+        parser.error("--folder cannot be combined with --tag or --property")
+    if args.sample_pattern is not None:
+        try:
+            sample_regex = re.compile(args.sample_pattern)
+        except re.error as e:
+            parser.error(f"--sample-pattern: {e}")
+        if "sample" not in sample_regex.groupindex:
+            parser.error("--sample-pattern must capture a named group sample")
+    if not 0 <= args.log_sample_rate <= 1:
+        parser.error("--log-sample-rate must be between 0 and 1")
+    if args.hedge_budget is not None and not 0 < args.hedge_budget <= 1:
+        parser.error("--hedge-budget must be greater than 0 and at most 1")
+    if args.max_response_size <= 0:
+        parser.error("--max-response-size must be greater than 0")
+    routes = None
+    if args.routes:
+        from dx_vc_file_transfer.routing import load_routes
+
+        try:
+            routes = load_routes(args.routes)
+        except (OSError, ValueError) as e:
+            parser.error(f"--routes: {e}")
+        if missing := sorted(
+            {route.token_env for route in routes if not os.getenv(route.token_env)}
+        ):
+            parser.error(f"--routes: API tokens not set in {', '.join(missing)}")
 
     accepted_extensions = [
         ext.strip() for ext in args.accepted_file_extensions.split(",")
     ]
+    if args.query_projects is None:
+        query_projects = [args.dx_project_id]
+    elif args.query_projects.strip() == "all":
+        query_projects = None
+    else:
+        query_projects = [project.strip() for project in args.query_projects.split(",")]
 
-    _transfer_files(
-        args.dx_project_id,
-        args.folder,
-        args.vclin_base_url,
-        args.dx_base_url,
-        accepted_extensions,
-        args.download_expiration,
+    circuit_breakers.failure_threshold = args.circuit_failure_threshold
+    circuit_breakers.recovery_timeout = args.circuit_recovery_timeout
+    tracer = tracing.Tracer(
+        exporter=(
+            tracing.OTLPJSONFileExporter(args.trace_file) if args.trace_file else None
+        )
     )
+    profiler = (
+        profiling.Profiler(args.profile, mode=args.profile_mode)
+        if args.profile
+        else None
+    )
+    with (
+        configure_logging(args.log_format, args.log_level, args.log_sample_rate),
+        tracing.use_tracer(tracer),
+        profiling.profile(profiler),
+    ):
+        _transfer_files(
+            args.dx_project_id,
+            args.folder or [],
+            args.vclin_base_url,
+            args.dx_base_url,
+            accepted_extensions,
+            args.download_expiration,
+            args.results_file,
+            args.results_format,
+            args.dedup,
+            [key.strip() for key in args.checksum_properties.split(",")],
+            args.http_transport,
+            args.hedge_budget,
+            args.tag or [],
+            _parse_properties(args.property or []),
+            query_projects,
+            routes,
+            args.group_samples,
+            args.sample_pattern,
+            args.sample_property,
+            args.max_response_size * 1024 * 1024,
+            not args.single_end,
+        )
@@ -0,0 +1,181 @@
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterator
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+if TYPE_CHECKING:
+    import requests
+
+# Responses larger than this are rejected instead of read into memory.
+DEFAULT_MAX_RESPONSE_SIZE = 256 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class ResponseTooLargeError(ValueError):
+    """
+    Raised when a response body exceeds the maximum response size.
+    """
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    _dumps, _loads = orjson.dumps, orjson.loads
+elif ujson is not None:  # pragma: no cover
+    BACKEND = "ujson"
+
+    def _dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode()
+
+    _loads = ujson.loads
+else:  # pragma: no cover
+    BACKEND = "json"
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serializes an object to compact UTF-8 encoded JSON with the fastest JSON
+    library installed, orjson, then ujson, then the standard library.
+    """
+    return _dumps(obj)
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserializes UTF-8 encoded JSON with the fastest JSON library installed.
+    """
+    return _loads(data)
+
+
+class _BodyReader:
+    """
+    File-like reader over the body of a streamed response, raising once more
+    than ``max_size`` bytes have been read.
+    """
+
+    def __init__(self, response: "requests.Response", max_size: int):
+        length = response.headers.get("Content-Length")
+        if length is not None and int(length) > max_size:
+            raise _too_large(response, max_size)
+        self.response = response
+        self.max_size = max_size
+        self.size = 0
+        self._chunks = iter(response.iter_content(CHUNK_SIZE))
+        self._buffer = b""
+
+    def _add(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise _too_large(self.response, self.max_size)
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            data = self._buffer + b"".join(self._chunks_checked())
+            self._buffer = b""
+            return data
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, b"")
+            if not chunk:
+                break
+            self._add(chunk)
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _chunks_checked(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self._add(chunk)
+            yield chunk
+
+
+def _too_large(response: "requests.Response", max_size: int) -> ResponseTooLargeError:
+    return ResponseTooLargeError(
+        f"Response from {response.url} exceeds the maximum response size of "
+        f"{max_size} bytes"
+    )
+
+
+def post_json(
+    client: "requests.Session",
+    url: str,
+    params: Dict[str, Any],
+    max_size: int = DEFAULT_MAX_RESPONSE_SIZE,
+) -> Any:
+    """
+    Posts the params as JSON and decodes the JSON response, reading at most
+    ``max_size`` bytes of it.
+
+    :param client: The HTTP client session to use for the request.
+    :type client: requests.Session
+    :param url: The URL to post to.
+    :type url: str
+    :param params: The JSON body of the request.
+    :type params: Dict[str, Any]
+    :param max_size: The maximum size of the response body in bytes.
+    :type max_size: int
+    :return: The decoded response.
+    :raises requests.HTTPError: If the response has an error status.
+    :raises ResponseTooLargeError: If the response body is too large.
+    """
+    response = client.post(url, data=dumps(params), headers=JSON_HEADERS, stream=True)
+    try:
+        response.raise_for_status()
+        return loads(_BodyReader(response, max_size).read())
+    finally:
+        response.close()
+
+
+def post_json_items(
+    client: "requests.Session",
+    url: str,
+    params: Dict[str, Any],
+    key: str,
+    max_size: int = DEFAULT_MAX_RESPONSE_SIZE,
+) -> Iterator[Any]:
+    """
+    Posts the params as JSON and yields the items of a list of the JSON
+    response as they are decoded. The response is parsed incrementally
+    when ijson is installed, so that the whole body is never held in memory.
+
+    :param client: The HTTP client session to use for the request.
+    :type client: requests.Session
+    :param url: The URL to post to.
+    :type url: str
+    :param params: The JSON body of the request.
+    :type params: Dict[str, Any]
+    :param key: The key of the list in the top level object of the response.
+    :type key: str
+    :param max_size: The maximum size of the response body in bytes.
+    :type max_size: int
+    :return: An iterator over the items of the list.
+    :raises requests.HTTPError: If the response has an error status.
+    :raises ResponseTooLargeError: If the response body is too large.
+    """
+    response = client.post(url, data=dumps(params), headers=JSON_HEADERS, stream=True)
+    try:
+        response.raise_for_status()
+        reader = _BodyReader(response, max_size)
+        if ijson is not None:
+            yield from ijson.items(reader, f"{key}.item", use_float=True)
+        else:
+            yield from loads(reader.read()).get(key) or []
+    finally:
+        response.close()
@@ -0,0 +1,71 @@
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from dx_vc_file_transfer.dnanexus import DXFile
+
+DEFAULT_CHECKSUM_PROPERTIES = ("md5", "md5sum", "checksum")
+
+
+def fingerprint(
+    file: "DXFile", checksum_properties: Sequence[str] = DEFAULT_CHECKSUM_PROPERTIES
+) -> Hashable:
+    """
+    Returns a content fingerprint for a file from its DNAnexus metadata.
+    The first checksum property found on the file is used, falling back to
+    the file name and size and finally to the file ID, which DNAnexus keeps
+    when a file is cloned to another project.
+
+    :param file: The file to fingerprint.
+    :type file: DXFile
+    :param checksum_properties: Names of the file properties holding a
+        content checksum, in order of preference.
+    :type checksum_properties: Sequence[str]
+    :return: A hashable fingerprint.
+    """
+    for key in checksum_properties:
+        if checksum := file.properties.get(key):
+            return "checksum", checksum.strip().lower()
+    if file.size is not None:
+        return "name-size", file.name, file.size
+    return "id", file.file_id
+
+
+def deduplicate(
+    files: List["DXFile"],
+    checksum_properties: Sequence[str] = DEFAULT_CHECKSUM_PROPERTIES,
+    partition: Optional[Callable[["DXFile"], Hashable]] = None,
+) -> Tuple[List["DXFile"], Dict[str, List["DXFile"]]]:
+    """
+    Groups files by content fingerprint keeping the first file of each group.
+
+    :param files: The files to deduplicate.
+    :type files: List[DXFile]
+    :param checksum_properties: Names of the file properties holding a
+        content checksum, in order of preference.
+    :type checksum_properties: Sequence[str]
+    :param partition: Returns the partition of a file, such as the route it
+        is submitted through. Files of different partitions are never
+        duplicates of each other.
+    :type partition: Optional[Callable[[DXFile], Hashable]]
+    :return: The unique files, in listing order, and a dictionary mapping
+        the file ID of each kept file to the duplicates it stands for.
+    """
+    originals: Dict[Hashable, "DXFile"] = {}
+    aliases: Dict[str, List["DXFile"]] = {}
+    for file in files:
+        key = fingerprint(file, checksum_properties)
+        if partition is not None:
+            key = partition(file), key
+        original = originals.setdefault(key, file)
+        if original is not file:
+            aliases.setdefault(original.file_id, []).append(file)
+    return list(originals.values()), aliases
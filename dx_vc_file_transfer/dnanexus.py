@@ -1,12 +1,78 @@
 import contextlib
 import dataclasses
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
 
+from dx_vc_file_transfer import codec, tracing
 from dx_vc_file_transfer.http_request import http_session
 
 if TYPE_CHECKING:
     import requests
 
+    from dx_vc_file_transfer.hedging import Hedger
+
+
+DESCRIBE_FIELDS = {
+    "name": True,
+    "project": True,
+    "folder": True,
+    "size": True,
+    "tags": True,
+    "properties": True,
+}
+
+# Maximum number of results per findDataObjects page allowed by the API.
+FIND_PAGE_SIZE = 1000
+
+
+@dataclasses.dataclass(kw_only=True)
+class DXFile:
+    """
+    A DNAnexus file selected for transfer.
+
+    :ivar file_id: The DNAnexus file ID.
+    :type file_id: str
+    :ivar name: The file name.
+    :type name: str
+    :ivar project_id: The ID of the project the file was listed in.
+    :type project_id: Optional[str]
+    :ivar folder: The folder of the file within the project.
+    :type folder: Optional[str]
+    :ivar size: The file size in bytes, if described.
+    :type size: Optional[int]
+    :ivar tags: The tags of the file.
+    :type tags: List[str]
+    :ivar properties: The properties of the file.
+    :type properties: Dict[str, str]
+    :ivar url: The preauthenticated download URL, from when it is minted
+        until the file is submitted.
+    :type url: Optional[str]
+    :ivar url_expires_at: Unix timestamp at which the download URL expires.
+    :type url_expires_at: Optional[float]
+    :ivar mint_latency: Seconds it took to mint the download URL.
+    :type mint_latency: Optional[float]
+    """
+
+    file_id: str
+    name: str
+    project_id: Optional[str] = None
+    folder: Optional[str] = None
+    size: Optional[int] = None
+    tags: List[str] = dataclasses.field(default_factory=list)
+    properties: Dict[str, str] = dataclasses.field(default_factory=dict)
+    url: Optional[str] = None
+    url_expires_at: Optional[float] = None
+    mint_latency: Optional[float] = None
+
 
 @dataclasses.dataclass(kw_only=True)
 class DNANexusClient:
@@ -29,6 +95,15 @@ class DNANexusClient:
     :ivar accepted_file_extensions: List of file extensions that are acceptable for
         filtering. Defaults to [".vcf", ".vcf.gz", ".fastq.gz"].
     :type accepted_file_extensions: List[str]
+    :ivar http_transport: The HTTP transport used for requests, "requests"
+        or "http2". Defaults to "requests".
+    :type http_transport: str
+    :ivar hedger: Hedges slow listFolder and download calls, which are safe
+        to repeat. Defaults to None, which disables hedging.
+    :type hedger: Optional[Hedger]
+    :ivar max_response_size: The maximum size in bytes of a response, larger
+        responses raise ResponseTooLargeError. Defaults to 256 MiB.
+    :type max_response_size: int
     """
 
     dx_api_token: str
@@ -41,21 +116,61 @@ class DNANexusClient:
             ".fastq.gz",
         ]
     )
+    http_transport: str = "requests"
+    hedger: Optional["Hedger"] = None
+    max_response_size: int = codec.DEFAULT_MAX_RESPONSE_SIZE
 
     @contextlib.contextmanager
     def client(self):
         """
         Context manager to create and manage the HTTP client session.
         """
-        client = http_session(self.dx_api_token)
+        client = http_session(self.dx_api_token, transport=self.http_transport)
         try:
             yield client
         finally:
             client.close()
 
+    def _post(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        client: "requests.Session",
+        items: Optional[str] = None,
+    ) -> Any:
+        """
+        Sends an API call that is safe to repeat, hedging it if a hedger is
+        configured.
+
+        :param url: The URL of the API call.
+        :type url: str
+        :param params: The JSON input of the API call.
+        :type params: Dict[str, Any]
+        :param client: The HTTP client session to use for the request.
+        :type client: requests.Session
+        :param items: The key of a list in the JSON output to return instead
+            of the whole output, parsed incrementally.
+        :type items: Optional[str]
+        :return: The JSON output of the API call.
+        """
+
+        def send() -> Any:
+            if items is None:
+                return codec.post_json(client, url, params, self.max_response_size)
+            return list(
+                codec.post_json_items(
+                    client, url, params, items, self.max_response_size
+                )
+            )
+
+        if self.hedger is None:
+            return send()
+        # Latencies are tracked per API method, such as listFolder.
+        return self.hedger.call(send, key=url.rsplit("/", 1)[-1])
+
     def _list_folder_files(
         self, project_id: str, folder: str, client: "requests.Session"
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[List[DXFile]]:
         """
         List files in a specific folder within a DNAnexus project.
 
@@ -65,39 +180,52 @@ class DNANexusClient:
         :type folder: str
         :param client: The HTTP client session to use for the request.
         :type client: requests.Session
-        :return: A dictionary containing the list of files with keys: id (str)
-        and describe (dict).
+        :return: The files of the folder having accepted extensions.
         """
         if not folder.startswith("/"):
             folder = f"/{folder}"
         url = f"{self.dx_base_url}/{project_id}/listFolder"
-        params = {"folder": folder, "only": "objects", "describe": True}
-        response = client.post(url, json=params)
-        response.raise_for_status()
-        files = response.json().get("objects", None)
+        params = {
+            "folder": folder,
+            "only": "objects",
+            "describe": {"fields": DESCRIBE_FIELDS},
+        }
+        with tracing.span(
+            "dnanexus.listFolder",
+            **{"dx.project_id": project_id, "dx.folder": folder},
+        ) as span:
+            files = self._post(url, params, client, items="objects")
+            span.set_attribute("dx.objects", len(files) if files else 0)
         return self._filter_files_by_extension(files) if files else None
 
-    def _filter_files_by_extension(self, files: List[Dict[str, Any]]) -> Dict[str, str]:
+    def _filter_files_by_extension(self, files: List[Dict[str, Any]]) -> List[DXFile]:
         """
-        Filters a list of files by their extensions and returns a dictionary
-        mapping file IDs to file names of the files having accepted extensions.
+        Filters a list of files by their extensions and returns the files
+        having accepted extensions.
 
         :param files: A list of dictionaries representing files,
             where each dictionary should include a key "id" with the identifier
             of the file and a key "describe" with the file's metadata.
         :type files: List[Dict[str, Any]]
-        :return: A dictionary where keys are file IDs (str) and the values
-            are file names (str) for files that have extensions
-            matching the accepted file extensions.
+        :return: The files that have extensions matching the accepted
+            file extensions.
         """
-        return {
-            file["id"]: file["describe"]["name"]
+        return [
+            DXFile(
+                file_id=file["id"],
+                name=file["describe"]["name"],
+                project_id=file["describe"].get("project"),
+                folder=file["describe"].get("folder"),
+                size=file["describe"].get("size"),
+                tags=file["describe"].get("tags") or [],
+                properties=file["describe"].get("properties") or {},
+            )
             for file in files
             if any(
                 file["describe"]["name"].endswith(ext)
                 for ext in self.accepted_file_extensions
             )
-        }
+        ]
 
     def _file_download_url(
         self, file_id: str, client: "requests.Session"
@@ -113,9 +241,123 @@ class DNANexusClient:
         """
         url = f"{self.dx_base_url}/{file_id}/download"
         params = {"duration": self.download_expiration, "preauthenticated": True}
-        response = client.post(url, json=params)
-        response.raise_for_status()
-        return response.json().get("url", None)
+        with tracing.span("dnanexus.download", **{"dx.file_id": file_id}):
+            return self._post(url, params, client).get("url", None)
+
+    def files_in_project_folder(
+        self, project_id: str, folder: str, client: "requests.Session"
+    ) -> List[DXFile]:
+        """
+        Retrieves the files having accepted extensions in a specific folder
+        of a DNAnexus project.
+
+        :param project_id: The ID of the DNAnexus project.
+        :type project_id: str
+        :param folder: The folder path within the project.
+        :type folder: str
+        :param client: The HTTP client session to use for the request.
+        :type client: requests.Session
+        :return: The files having accepted extensions.
+        """
+        return self._list_folder_files(project_id, folder, client) or []
+
+    def _find_data_objects(
+        self,
+        project_id: Optional[str],
+        tags: Sequence[str],
+        properties: Dict[str, Any],
+        client: "requests.Session",
+    ) -> List[Dict[str, Any]]:
+        """
+        Searches for closed files having all the tags and properties, paging
+        through the results.
+
+        :param project_id: The ID of the project to search, None to search all
+            projects accessible with the API token.
+        :type project_id: Optional[str]
+        :param tags: The tags the files must all have.
+        :type tags: Sequence[str]
+        :param properties: The properties the files must have, a value of True
+            matching any value.
+        :type properties: Dict[str, Any]
+        :param client: The HTTP client session to use for the requests.
+        :type client: requests.Session
+        :return: The found files with their description.
+        """
+        url = f"{self.dx_base_url}/system/findDataObjects"
+        params: Dict[str, Any] = {
+            "class": "file",
+            "state": "closed",
+            "describe": {"fields": DESCRIBE_FIELDS},
+            "limit": FIND_PAGE_SIZE,
+        }
+        if project_id is not None:
+            params["scope"] = {"project": project_id, "folder": "/", "recurse": True}
+        if tags:
+            params["tags"] = {"$and": list(tags)}
+        if properties:
+            params["properties"] = properties
+        results = []
+        with tracing.span(
+            "dnanexus.findDataObjects", **{"dx.project_id": project_id}
+        ) as span:
+            while True:
+                # Copied, a hedged duplicate may not have sent the previous page yet.
+                page = self._post(url, dict(params), client)
+                results.extend(page.get("results") or [])
+                if not page.get("next"):
+                    break
+                params["starting"] = page["next"]
+            span.set_attribute("dx.objects", len(results))
+        return results
+
+    def find_files(
+        self,
+        projects: Optional[Sequence[str]],
+        tags: Sequence[str],
+        properties: Dict[str, Any],
+        client: "requests.Session",
+    ) -> List[DXFile]:
+        """
+        Retrieves the files having accepted extensions, all the tags and all
+        the properties, across several DNAnexus projects.
+
+        :param projects: The IDs of the projects to search, None to search all
+            projects accessible with the API token.
+        :type projects: Optional[Sequence[str]]
+        :param tags: The tags the files must all have.
+        :type tags: Sequence[str]
+        :param properties: The properties the files must have, a value of True
+            matching any value.
+        :type properties: Dict[str, Any]
+        :param client: The HTTP client session to use for the requests.
+        :type client: requests.Session
+        :return: The files having accepted extensions.
+        """
+        files = []
+        for project_id in projects if projects is not None else [None]:
+            files.extend(self._find_data_objects(project_id, tags, properties, client))
+        return self._filter_files_by_extension(files)
+
+    def iter_download_urls(
+        self, files: Iterable[DXFile], client: "requests.Session"
+    ) -> Iterator[DXFile]:
+        """
+        Mints a download URL for each file as the files are consumed, so
+        that URLs are only requested right before they are used.
+
+        :param files: The files to mint download URLs for.
+        :type files: Iterable[DXFile]
+        :param client: The HTTP client session to use for the requests.
+        :type client: requests.Session
+        :return: An iterator over the files with their download URL set.
+        """
+        for file in files:
+            start = time.monotonic()
+            file.url = self._file_download_url(file.file_id, client)
+            file.mint_latency = time.monotonic() - start
+            file.url_expires_at = time.time() + self.download_expiration
+            yield file
 
     def files_download_urls_in_project_folder(
         self, project_id: str, folder: str
@@ -131,9 +373,9 @@ class DNANexusClient:
             of files that have accepted extensions.
         """
         with self.client() as client:
-            if files := self._list_folder_files(project_id, folder, client):
+            if files := self.files_in_project_folder(project_id, folder, client):
                 return {
-                    self._file_download_url(file_id, client): file_name
-                    for file_id, file_name in files.items()
+                    file.url: file.name
+                    for file in self.iter_download_urls(files, client)
                 }
         return None
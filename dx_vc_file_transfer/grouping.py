@@ -0,0 +1,195 @@
+import dataclasses
+import re
+import statistics
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Optional, Tuple
+
+from dx_vc_file_transfer.results import STATUS_SUBMITTED, TransferResult
+
+if TYPE_CHECKING:
+    from dx_vc_file_transfer.dnanexus import DXFile
+
+# Matches Illumina style FASTQ names such as NA12878_S1_L001_R1_001.fastq.gz
+# or NA12878_R2.fastq.gz, capturing the sample, lane and read.
+DEFAULT_SAMPLE_PATTERN = (
+    r"^(?P<sample>.+?)(?:_S\d+)?(?:_L(?P<lane>\d+))?_(?P<read>R?[12])(?:_\d+)?"
+    r"\.f(?:ast)?q(?:\.gz)?$"
+)
+PAIRED_READS = ("R1", "R2")
+
+
+@dataclasses.dataclass(kw_only=True)
+class SampleGroup:
+    """
+    The files of a sample, submitted together.
+
+    :ivar sample: The sample name.
+    :type sample: str
+    :ivar files: The files of the sample, ordered by lane and read.
+    :type files: List[DXFile]
+    :ivar missing: The mates or lanes missing from the sample, such as
+        "L002 R2".
+    :type missing: List[str]
+    """
+
+    sample: str
+    files: List["DXFile"] = dataclasses.field(default_factory=list)
+    missing: List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+def _missing_mates(reads: Dict[Optional[int], set], paired: bool = True) -> List[str]:
+    """
+    Returns the lanes missing between the first lane and the last lane, and
+    the reads missing from each lane for paired end reads.
+    """
+    missing = []
+    lanes = sorted(lane for lane in reads if lane is not None)
+    if lanes:
+        missing.extend(
+            f"L{lane:03d}"
+            for lane in range(lanes[0], lanes[-1] + 1)
+            if lane not in reads
+        )
+    if not paired:
+        return sorted(missing)
+    for lane in sorted(reads, key=lambda lane: lane or 0):
+        prefix = f"L{lane:03d} " if lane is not None else ""
+        missing.extend(
+            f"{prefix}{read}" for read in PAIRED_READS if read not in reads[lane]
+        )
+    return sorted(missing)
+
+
+def group_samples(
+    files: List["DXFile"],
+    pattern: Optional[str] = None,
+    sample_property: Optional[str] = None,
+    paired: bool = True,
+) -> List[SampleGroup]:
+    """
+    Groups the files by sample, so that the paired reads and lanes of a
+    sample are submitted together. Files are grouped by the value of the
+    sample property when given, otherwise by the sample captured by the
+    pattern from the names of the files in the same folder. Files matching
+    neither are samples of their own. The reads and lanes captured by the
+    pattern are checked for missing lanes, and for missing mates when the
+    reads are paired.
+
+    :param files: The files to group.
+    :type files: List[DXFile]
+    :param pattern: Regular expression matching file names, capturing the
+        "sample" and optionally the "lane" and "read" as named groups.
+        Defaults to DEFAULT_SAMPLE_PATTERN.
+    :type pattern: Optional[str]
+    :param sample_property: The DNAnexus file property holding the sample.
+    :type sample_property: Optional[str]
+    :param paired: Whether the samples have paired end reads, so that a
+        lane missing its R1 or R2 mate makes a sample incomplete.
+    :type paired: bool
+    :return: The complete samples followed by the incomplete samples, each
+        in the order they were first listed.
+    """
+    regex = re.compile(pattern or DEFAULT_SAMPLE_PATTERN)
+    groups: Dict[Hashable, SampleGroup] = {}
+    reads: Dict[Hashable, Dict[Optional[int], set]] = {}
+    order: Dict[str, Tuple[int, str]] = {}
+    for file in files:
+        match = regex.match(file.name)
+        if sample_property and file.properties.get(sample_property):
+            sample = file.properties[sample_property]
+            key: Hashable = ("property", sample)
+        elif match:
+            sample = match.group("sample")
+            key = ("name", file.project_id, file.folder, sample)
+        else:
+            sample = file.name
+            key = ("file", file.file_id)
+        groups.setdefault(key, SampleGroup(sample=sample)).files.append(file)
+        lane, read = None, None
+        if match:
+            lane = match.groupdict().get("lane")
+            lane = int(lane) if lane else None
+            read = match.groupdict().get("read")
+        if read:
+            read = f"R{read.lstrip('R')}"
+            reads.setdefault(key, {}).setdefault(lane, set()).add(read)
+        order[file.file_id] = (lane or 0, read or "")
+    for key, group in groups.items():
+        group.files.sort(key=lambda file: order[file.file_id])
+        if key in reads:
+            group.missing = _missing_mates(reads[key], paired)
+    return sorted(groups.values(), key=lambda group: not group.complete)
+
+
+class SampleTracker:
+    """
+    Tracks the submission of the files of each sample, recording how long
+    after the start of the submissions each sample was ready for analysis,
+    that is had all its files submitted. Incomplete samples are never ready.
+
+    :param groups: The samples being submitted.
+    :type groups: List[SampleGroup]
+    :param clock: Monotonic clock returning seconds.
+    :type clock: Callable[[], float]
+    """
+
+    def __init__(
+        self, groups: List[SampleGroup], clock: Callable[[], float] = time.monotonic
+    ):
+        self.groups = groups
+        self.clock = clock
+        self.start = clock()
+        self.ready_after: List[float] = []
+        self.failed = 0
+        self._group_of = {
+            file.file_id: index
+            for index, group in enumerate(groups)
+            for file in group.files
+        }
+        self._remaining = [len(group.files) for group in groups]
+        self._failed = [False] * len(groups)
+
+    def record(self, result: TransferResult) -> Optional[float]:
+        """
+        Records the outcome of submitting a file, setting the sample of the
+        result and, for the file completing a sample, when it became ready.
+
+        :param result: The outcome of submitting a file.
+        :type result: TransferResult
+        :return: The seconds after which the sample of the file became ready
+            for analysis, if this file completed it.
+        """
+        index = self._group_of.get(result.file_id)
+        if index is None:
+            return None
+        group = self.groups[index]
+        result.sample = group.sample
+        self._remaining[index] -= 1
+        if result.status != STATUS_SUBMITTED and not self._failed[index]:
+            self._failed[index] = True
+            self.failed += 1
+        if self._remaining[index] or self._failed[index] or not group.complete:
+            return None
+        result.ready_after = self.clock() - self.start
+        self.ready_after.append(result.ready_after)
+        return result.ready_after
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """
+        Returns the number of samples ready for analysis and failed, with the
+        median and maximum seconds after which samples were ready.
+        """
+        return {
+            "samples": len(self.groups),
+            "ready": len(self.ready_after),
+            "failed": self.failed,
+            "incomplete": sum(not group.complete for group in self.groups),
+            "median_ready_after": (
+                statistics.median(self.ready_after) if self.ready_after else None
+            ),
+            "max_ready_after": max(self.ready_after, default=None),
+        }
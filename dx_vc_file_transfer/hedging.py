@@ -0,0 +1,183 @@
+import collections
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Deque, Dict, TypeVar
+
+from dx_vc_file_transfer import tracing
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Sends a duplicate of a slow call once it has not answered within the
+    recent p95 latency of calls of the same kind, returning whichever answers
+    first. Only use it for calls that are safe to repeat. The number of
+    duplicates is capped at a fraction of all calls, allowing one duplicate
+    from the first call, and at a number of duplicates running at once. Calls
+    that could not be hedged anyway run in the calling thread, the others in
+    a pool separate from the duplicates so that slow duplicates never hold
+    them up.
+
+    :param budget: The maximum fraction of calls that may be duplicated.
+    :type budget: float
+    :param percentile: The latency percentile after which a call is hedged.
+    :type percentile: float
+    :param initial_delay: Seconds after which a call is hedged until enough
+        latencies have been observed.
+    :type initial_delay: float
+    :param min_delay: The minimum number of seconds before hedging a call.
+    :type min_delay: float
+    :param window: The number of recent latencies of each kind of call the
+        percentile is taken over.
+    :type window: int
+    :param min_samples: The number of latencies needed before the percentile
+        is used.
+    :type min_samples: int
+    :param max_workers: The maximum number of calls running at once.
+    :type max_workers: int
+    :param max_hedges: The maximum number of duplicates running at once.
+    :type max_hedges: int
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.05,
+        percentile: float = 0.95,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 32,
+        max_hedges: int = 4,
+    ):
+        self.budget = budget
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.calls = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self._running_hedges = 0
+        self._latencies: Dict[str, Deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=window)
+        )
+        self._lock = threading.Lock()
+        self._primaries = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dx-vc-call"
+        )
+        self._hedges = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_hedges, thread_name_prefix="dx-vc-hedge"
+        )
+
+    def delay(self, key: str = "default") -> float:
+        """
+        Returns the number of seconds to wait before hedging a call.
+
+        :param key: The kind of call.
+        :type key: str
+        """
+        with self._lock:
+            if len(self._latencies[key]) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies[key])
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile))
+        return max(self.min_delay, latencies[index])
+
+    def _may_hedge(self) -> bool:
+        # One hedge is allowed from the first call, so that the first calls
+        # of a run, such as listing the folders, can be hedged too.
+        return (
+            self.budget > 0
+            and self.hedges < max(1, self.budget * self.calls)
+            and self._running_hedges < self.max_hedges
+        )
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if not self._may_hedge():
+                return False
+            self.hedges += 1
+            self._running_hedges += 1
+            return True
+
+    def _hedge_done(self, _: concurrent.futures.Future):
+        with self._lock:
+            self._running_hedges -= 1
+
+    def _record(self, key: str, latency: float):
+        with self._lock:
+            self._latencies[key].append(latency)
+
+    def _submit(
+        self,
+        executor: concurrent.futures.ThreadPoolExecutor,
+        fn: Callable[[], T],
+        key: str,
+    ) -> concurrent.futures.Future:
+        start = time.monotonic()
+        future = executor.submit(contextvars.copy_context().run, fn)
+
+        def record(done: concurrent.futures.Future):
+            if done.exception() is None:
+                self._record(key, time.monotonic() - start)
+
+        future.add_done_callback(record)
+        return future
+
+    def call(self, fn: Callable[[], T], key: str = "default") -> T:
+        """
+        Calls ``fn`` and hedges it with a second call if it is slow and the
+        budget allows it.
+
+        :param fn: The call to make, safe to repeat.
+        :type fn: Callable[[], T]
+        :param key: The kind of call, such as the API endpoint. Calls are
+            hedged after the latency percentile of calls of the same kind.
+        :type key: str
+        :return: The result of the first call that succeeds.
+        """
+        with self._lock:
+            self.calls += 1
+            inline = not self._may_hedge()
+        if inline:
+            start = time.monotonic()
+            result = fn()
+            self._record(key, time.monotonic() - start)
+            return result
+        delay = self.delay(key)
+        primary = self._submit(self._primaries, fn, key)
+        pending = {primary}
+        done, pending = concurrent.futures.wait(pending, timeout=delay)
+        hedge = None
+        if not done and self._allow_hedge():
+            logger.debug("Hedging %s call still running after %.3f seconds", key, delay)
+            tracing.current_span().add_event("hedge", key=key, delay=delay)
+            hedge = self._submit(self._hedges, fn, key)
+            hedge.add_done_callback(self._hedge_done)
+            pending.add(hedge)
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+                error = error or future.exception()
+            if not pending:
+                raise error
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+    def close(self):
+        self._primaries.shutdown(wait=False)
+        self._hedges.shutdown(wait=False)
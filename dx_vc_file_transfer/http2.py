@@ -0,0 +1,237 @@
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from dx_vc_file_transfer import codec, tracing
+from dx_vc_file_transfer.circuit_breaker import CircuitBreakerRegistry
+from dx_vc_file_transfer.http_request import CircuitOpenError
+
+try:
+    import httpx
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "The http2 transport requires httpx with HTTP/2 support, "
+        "install the http2 extra or run: pip install 'httpx[http2]'"
+    ) from e
+
+
+class HTTP2Response:
+    """
+    Exposes an ``httpx`` response through the subset of the
+    ``requests.Response`` interface used by the API clients.
+    """
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+
+    @property
+    def reason(self) -> str:
+        return self._response.reason_phrase
+
+    @property
+    def headers(self) -> "httpx.Headers":
+        return self._response.headers
+
+    @property
+    def url(self) -> str:
+        return str(self._response.url)
+
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+
+    @property
+    def http_version(self) -> str:
+        return self._response.http_version
+
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        return self._response.iter_bytes(chunk_size)
+
+    def json(self) -> Any:
+        return codec.loads(self.content)
+
+    def close(self):
+        self._response.close()
+
+    def raise_for_status(self):
+        """
+        Raises ``requests.HTTPError`` for 4xx and 5xx responses, so that
+        callers handle errors the same way for every transport.
+        """
+        if not self._response.is_error:
+            return
+        kind = "Client" if self.status_code < 500 else "Server"
+        raise requests.HTTPError(
+            f"{self.status_code} {kind} Error: {self.reason} "
+            f"for url: {self._response.url}",
+            response=self,
+        )
+
+
+def _translate_error(error: "httpx.TransportError") -> requests.RequestException:
+    """
+    Maps ``httpx`` transport errors to the equivalent ``requests`` exceptions.
+    """
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(str(error))
+    if isinstance(error, httpx.TimeoutException):
+        return requests.ReadTimeout(str(error))
+    return requests.ConnectionError(str(error))
+
+
+class HTTP2Session:
+    """
+    HTTP transport based on ``httpx`` multiplexing concurrent requests to a
+    host over a few HTTP/2 connections. It applies the same timeouts, retry
+    policy and circuit breaking as the default ``requests`` transport and is
+    safe to share between threads.
+
+    :param headers: Headers sent with every request.
+    :type headers: Dict[str, str]
+    :param retries: The maximum number of retries of a failed request.
+    :type retries: int
+    :param backoff: The exponential backoff factor between retries.
+    :type backoff: float
+    :param retry_http_codes: HTTP status codes that trigger a retry.
+    :type retry_http_codes: List[int]
+    :param circuit_breakers: The registry of per host circuit breakers.
+    :type circuit_breakers: Optional[CircuitBreakerRegistry]
+    :param timeout: Connect and read timeouts in seconds.
+    :type timeout: Tuple[float, float]
+    :param max_connections: The maximum number of connections per host.
+    :type max_connections: int
+    :param http1: Whether HTTP/1.1 may be negotiated. Disabling it talks
+        HTTP/2 with prior knowledge, which plain http:// URLs require.
+    :type http1: bool
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        retries: int = 5,
+        backoff: float = 1.0,
+        retry_http_codes: List[int] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+        timeout: Tuple[float, float] = (10, 30),
+        max_connections: int = 10,
+        http1: bool = True,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_http_codes = (
+            retry_http_codes if retry_http_codes is not None else [503, 429]
+        )
+        self.circuit_breakers = circuit_breakers
+        self.client = httpx.Client(
+            http1=http1,
+            http2=True,
+            headers=headers,
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    @property
+    def headers(self) -> "httpx.Headers":
+        return self.client.headers
+
+    def request(
+        self, method: str, url: str, stream: bool = False, **kwargs
+    ) -> HTTP2Response:
+        """
+        Sends a request, retrying on transport errors and on the configured
+        status codes with exponential backoff.
+
+        :param method: HTTP method (GET, POST, etc.)
+        :param url: URL for the request
+        :param stream: Whether to leave the response body unread, to be
+            read with ``iter_content``.
+        :return: Response object
+        """
+        if isinstance(kwargs.get("data"), bytes):
+            # httpx takes raw request bodies as content.
+            kwargs["content"] = kwargs.pop("data")
+        parts = urlsplit(url)
+        breaker = (
+            self.circuit_breakers.get(parts.hostname)
+            if self.circuit_breakers is not None
+            else None
+        )
+        with tracing.span(
+            f"HTTP {method}",
+            tracing.SPAN_KIND_CLIENT,
+            **{
+                "http.request.method": method,
+                "server.address": parts.hostname,
+                "url.path": parts.path,
+            },
+        ) as span:
+            if breaker is not None and not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for host {breaker.host}")
+            for attempt in range(self.retries + 1):
+                response, error = None, None
+                try:
+                    response = self.client.send(
+                        self.client.build_request(method, url, **kwargs),
+                        stream=stream,
+                    )
+                except httpx.TransportError as e:
+                    error = e
+                if breaker is not None:
+                    if error is not None or response.status_code >= 500:
+                        breaker.record_failure()
+                        if breaker.is_open:
+                            if response is not None:
+                                response.close()
+                            raise CircuitOpenError(
+                                f"Circuit open for host {breaker.host}"
+                            ) from error
+                    else:
+                        breaker.record_success()
+                retry = error is not None or (
+                    response.status_code in self.retry_http_codes
+                )
+                if not retry or attempt == self.retries:
+                    break
+                if response is not None:
+                    response.close()
+                span.set_attribute("http.request.resend_count", attempt + 1)
+                span.add_event(
+                    "retry",
+                    attempt=attempt + 1,
+                    **{
+                        "http.response.status_code": (
+                            response.status_code if response is not None else None
+                        ),
+                        "error.type": type(error).__name__ if error else None,
+                    },
+                )
+                time.sleep(self.backoff * 2**attempt)
+            if error is not None:
+                raise _translate_error(error) from error
+            span.set_attribute("http.response.status_code", response.status_code)
+            if not stream:
+                span.set_attribute("http.response.body.size", len(response.content))
+            elif (length := response.headers.get("Content-Length")) is not None:
+                span.set_attribute("http.response.body.size", int(length))
+            span.set_attribute("http.request.resend_count", attempt)
+            span.set_attribute("network.protocol.version", response.http_version)
+            if breaker is not None:
+                span.set_attribute("circuit.state", breaker.state)
+            if response.is_error:
+                span.set_status(tracing.STATUS_ERROR, response.reason_phrase)
+            return HTTP2Response(response)
+
+    def post(self, url: str, **kwargs) -> HTTP2Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> HTTP2Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        self.client.close()
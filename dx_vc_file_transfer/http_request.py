@@ -1,10 +1,99 @@
-from typing import List
+from typing import Any, List, Optional, Protocol
+from urllib.parse import urlsplit
 
 import requests
 from requests.adapters import HTTPAdapter, Retry
+from urllib3.exceptions import MaxRetryError, ResponseError
+
+from dx_vc_file_transfer import tracing
+from dx_vc_file_transfer.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    circuit_breakers,
+)
+
+TRANSPORTS = ("requests", "http2")
+
+
+class HTTPTransport(Protocol):
+    """
+    The interface the API clients use to send requests. Responses expose the
+    ``requests.Response`` attributes ``status_code``, ``reason``, ``headers``,
+    ``content``, ``json()`` and ``raise_for_status()``, and errors are raised as
+    ``requests`` exceptions whatever the transport.
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> Any: ...
+
+    def post(self, url: str, **kwargs) -> Any: ...
+
+    def close(self): ...
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of sending a request to a host whose circuit is open.
+    """
+
+
+class CircuitBreakerRetry(Retry):
+    """
+    Retry policy reporting every failed attempt to the circuit breaker of
+    the host, and giving up on the remaining retries once the circuit opens.
+    Each retry is recorded as a ``retry`` event on the current span, so that
+    requests that exhaust their retries are traced too.
+
+    :param circuit_breakers: The registry holding the breaker of each host.
+    :type circuit_breakers: Optional[CircuitBreakerRegistry]
+    """
+
+    def __init__(
+        self, *args, circuit_breakers: Optional[CircuitBreakerRegistry] = None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.circuit_breakers = circuit_breakers
+
+    def new(self, **kw) -> "CircuitBreakerRetry":
+        retry = super().new(**kw)
+        retry.circuit_breakers = self.circuit_breakers
+        return retry
+
+    def increment(
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ) -> "CircuitBreakerRetry":
+        failed = error is not None or (response is not None and response.status >= 500)
+        if self.circuit_breakers is not None and _pool is not None and failed:
+            breaker = self.circuit_breakers.get(_pool.host)
+            breaker.record_failure()
+            if breaker.is_open:
+                raise MaxRetryError(
+                    _pool, url, error or ResponseError(f"circuit open for {_pool.host}")
+                )
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        span = tracing.current_span()
+        if span.is_recording:
+            span.set_attribute("http.request.resend_count", len(retry.history))
+            span.add_event(
+                "retry",
+                attempt=len(retry.history),
+                **{
+                    "http.response.status_code": (
+                        response.status if response is not None else None
+                    ),
+                    "error.type": type(error).__name__ if error else None,
+                },
+            )
+        return retry
 
 
 class TimeOutSession(requests.Session):
+    circuit_breakers: Optional[CircuitBreakerRegistry] = None
 
     def request(self, method: str, url: str, **kwargs) -> requests.Response:
         """
@@ -16,7 +105,71 @@ class TimeOutSession(requests.Session):
         :return: Response object
         """
         kwargs.setdefault("timeout", (10, 30))
-        return super().request(method, url, **kwargs)
+        parts = urlsplit(url)
+        breaker = (
+            self.circuit_breakers.get(parts.hostname)
+            if self.circuit_breakers is not None
+            else None
+        )
+        with tracing.span(
+            f"HTTP {method}",
+            tracing.SPAN_KIND_CLIENT,
+            **{
+                "http.request.method": method,
+                "server.address": parts.hostname,
+                "url.path": parts.path,
+            },
+        ) as span:
+            if breaker is None:
+                response = super().request(method, url, **kwargs)
+            else:
+                response = self._guarded_request(breaker, method, url, **kwargs)
+                span.set_attribute("circuit.state", breaker.state)
+            if span.is_recording:
+                _record_response(span, response, kwargs.get("stream", False))
+            return response
+
+    def _guarded_request(
+        self, breaker: CircuitBreaker, method: str, url: str, **kwargs
+    ) -> requests.Response:
+        """
+        Sends a request unless the circuit of the host is open, reporting
+        the outcome to the circuit breaker. Failed attempts are reported by
+        the retry policy, so only the final response is reported here.
+        """
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for host {breaker.host}")
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            if breaker.is_open:
+                raise CircuitOpenError(f"Circuit open for host {breaker.host}") from e
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+def _record_response(
+    span: tracing.Span, response: requests.Response, stream: bool = False
+):
+    """
+    Records the outcome of a request on its span, the retry attempts being
+    recorded by the retry policy as they happen. The body of a streamed
+    response is left unread, its size is taken from the headers.
+    """
+    span.set_attribute("http.response.status_code", response.status_code)
+    if not stream:
+        span.set_attribute("http.response.body.size", len(response.content))
+    elif (length := response.headers.get("Content-Length")) is not None:
+        span.set_attribute("http.response.body.size", int(length))
+    retries = getattr(response.raw, "retries", None)
+    history = getattr(retries, "history", None) or ()
+    span.set_attribute("http.request.resend_count", len(history))
+    if response.status_code >= 400:
+        span.set_status(tracing.STATUS_ERROR, response.reason)
 
 
 def http_session(
@@ -24,7 +177,9 @@ def http_session(
     retries: int = 5,
     backoff: float = 1.0,
     retry_http_codes: List[int] = None,
-) -> requests.Session:
+    breakers: Optional[CircuitBreakerRegistry] = circuit_breakers,
+    transport: str = "requests",
+) -> HTTPTransport:
     """
     Creates and configures an HTTP session with retry capabilities
     and bearer token authorization headers.
@@ -40,9 +195,16 @@ def http_session(
     :param retry_http_codes: The list of HTTP status codes that should trigger a retry.
         Defaults to [503, 429] if not specified.
     :type retry_http_codes: List[int]
-    :return: A configured `requests.Session` object with custom retry logic and
+    :param breakers: The registry of per host circuit breakers, shared by all
+        sessions by default. ``None`` disables circuit breaking.
+    :type breakers: Optional[CircuitBreakerRegistry]
+    :param transport: "requests" for a `requests.Session`, or "http2" for a
+        session multiplexing requests over HTTP/2 connections, which
+        requires httpx with HTTP/2 support.
+    :type transport: str
+    :return: A configured session with custom retry logic and
         authorization headers.
-    :rtype: requests.Session
+    :rtype: HTTPTransport
     """
     if retry_http_codes is None:
         retry_http_codes = [503, 429]
@@ -50,14 +212,28 @@ def http_session(
         "Accept": "application/json",
         "Authorization": f"Bearer {token}",
     }
-    retry_policy = Retry(
+    if transport == "http2":
+        from dx_vc_file_transfer.http2 import HTTP2Session
+
+        return HTTP2Session(
+            headers,
+            retries=retries,
+            backoff=backoff,
+            retry_http_codes=retry_http_codes,
+            circuit_breakers=breakers,
+        )
+    if transport != "requests":
+        raise ValueError(f"Unknown HTTP transport {transport}")
+    retry_policy = CircuitBreakerRetry(
         total=retries,
         backoff_factor=backoff,
         status_forcelist=retry_http_codes,
         allowed_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD"],
+        circuit_breakers=breakers,
     )
     adapter = HTTPAdapter(max_retries=retry_policy)
     client = TimeOutSession()
+    client.circuit_breakers = breakers
     client.headers.update(headers)
     client.mount("http://", adapter)
     client.mount("https://", adapter)
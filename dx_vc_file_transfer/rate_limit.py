@@ -0,0 +1,46 @@
+import threading
+import time
+from typing import Callable
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that at most ``rate`` requests per second are
+    sent. Safe to share between threads.
+
+    :param rate: The maximum number of requests per second.
+    :type rate: float
+    :param clock: Monotonic clock returning seconds.
+    :type clock: Callable[[], float]
+    :param sleep: Function sleeping for a number of seconds.
+    :type sleep: Callable[[float], None]
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Waits until the next request may be sent.
+
+        :return: The number of seconds waited.
+        """
+        with self._lock:
+            now = self.clock()
+            send_at = max(now, self._next_at)
+            self._next_at = send_at + 1 / self.rate
+        wait = send_at - now
+        if wait > 0:
+            self.sleep(wait)
+        return wait
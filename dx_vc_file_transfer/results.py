@@ -0,0 +1,153 @@
+import collections
+import contextlib
+import csv
+import dataclasses
+import datetime
+import json
+import sys
+from typing import IO, TYPE_CHECKING, Counter, Iterator, Optional
+
+if TYPE_CHECKING:
+    from dx_vc_file_transfer.dnanexus import DXFile
+
+RESULT_FORMATS = ("jsonl", "csv")
+
+STATUS_SUBMITTED = "submitted"
+STATUS_FAILED = "failed"
+STATUS_DUPLICATE = "duplicate"
+
+
+@dataclasses.dataclass(kw_only=True)
+class TransferResult:
+    """
+    The outcome of submitting a single DNAnexus file to VarSome Clinical.
+    The preauthenticated download URL is deliberately not part of the result
+    as it grants access to the file until it expires.
+
+    :ivar file_id: The DNAnexus file ID.
+    :type file_id: str
+    :ivar file_name: The file name.
+    :type file_name: str
+    :ivar project_id: The DNAnexus project ID.
+    :type project_id: Optional[str]
+    :ivar size: The file size in bytes.
+    :type size: Optional[int]
+    :ivar url_expires_at: ISO 8601 UTC time at which the download URL expires.
+    :type url_expires_at: Optional[str]
+    :ivar sample_file_id: The ID of the VarSome Clinical sample file.
+    :type sample_file_id: Optional[str]
+    :ivar status: One of "submitted", "failed" or "duplicate".
+    :type status: str
+    :ivar error: The error that caused the submission to fail.
+    :type error: Optional[str]
+    :ivar alias_of: For duplicates, the file ID of the file submitted in
+        their place.
+    :type alias_of: Optional[str]
+    :ivar mint_latency: Seconds it took to mint the download URL.
+    :type mint_latency: Optional[float]
+    :ivar submit_latency: Seconds it took to submit the file to VarSome Clinical.
+    :type submit_latency: Optional[float]
+    :ivar target: The name of the route of the VarSome Clinical instance the
+        file was submitted to, when routing files.
+    :type target: Optional[str]
+    :ivar sample: The sample of the file, when grouping files by sample.
+    :type sample: Optional[str]
+    :ivar ready_after: For the file completing a sample, the seconds after
+        the start of the submissions at which the sample was ready for
+        analysis.
+    :type ready_after: Optional[float]
+    """
+
+    file_id: str
+    file_name: str
+    project_id: Optional[str] = None
+    size: Optional[int] = None
+    url_expires_at: Optional[str] = None
+    sample_file_id: Optional[str] = None
+    status: str = STATUS_SUBMITTED
+    error: Optional[str] = None
+    alias_of: Optional[str] = None
+    mint_latency: Optional[float] = None
+    submit_latency: Optional[float] = None
+    target: Optional[str] = None
+    sample: Optional[str] = None
+    ready_after: Optional[float] = None
+
+    @classmethod
+    def for_file(cls, file: "DXFile", **kwargs) -> "TransferResult":
+        """
+        Creates a result carrying the metadata of a DNAnexus file.
+        """
+        return cls(
+            file_id=file.file_id,
+            file_name=file.name,
+            project_id=file.project_id,
+            size=file.size,
+            url_expires_at=(
+                datetime.datetime.fromtimestamp(
+                    file.url_expires_at, datetime.timezone.utc
+                ).isoformat(timespec="seconds")
+                if file.url_expires_at is not None
+                else None
+            ),
+            mint_latency=file.mint_latency,
+            **kwargs,
+        )
+
+
+class ResultSink:
+    """
+    Writes transfer results as they complete, flushing every record so that
+    the output can be followed live. Only per status counts are kept in
+    memory. A sink without a stream only counts results.
+
+    :param stream: The text stream results are written to.
+    :type stream: Optional[IO[str]]
+    :param fmt: Either "jsonl" or "csv".
+    :type fmt: str
+    """
+
+    def __init__(self, stream: Optional[IO[str]] = None, fmt: str = "jsonl"):
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.counts: Counter[str] = collections.Counter()
+        self._csv_writer = None
+        if stream is not None and fmt == "csv":
+            self._csv_writer = csv.DictWriter(
+                stream, fieldnames=[f.name for f in dataclasses.fields(TransferResult)]
+            )
+            self._csv_writer.writeheader()
+
+    def write(self, result: TransferResult):
+        self.counts[result.status] += 1
+        if self.stream is None:
+            return
+        record = dataclasses.asdict(result)
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(record)
+        else:
+            self.stream.write(json.dumps(record, separators=(",", ":")))
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+@contextlib.contextmanager
+def open_result_sink(path: Optional[str], fmt: str = "jsonl") -> Iterator[ResultSink]:
+    """
+    Opens a result sink writing to a file, to stdout when the path is "-",
+    or only counting results when no path is given.
+
+    :param path: The output file path.
+    :type path: Optional[str]
+    :param fmt: Either "jsonl" or "csv".
+    :type fmt: str
+    """
+    if path is None:
+        yield ResultSink(fmt=fmt)
+    elif path == "-":
+        yield ResultSink(sys.stdout, fmt)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as fp:
+            yield ResultSink(fp, fmt)
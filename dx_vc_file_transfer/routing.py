@@ -0,0 +1,194 @@
+import concurrent.futures
+import contextvars
+import dataclasses
+import fnmatch
+import json
+import queue
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from dx_vc_file_transfer.dnanexus import DXFile
+    from dx_vc_file_transfer.results import TransferResult
+
+
+@dataclasses.dataclass(kw_only=True)
+class Route:
+    """
+    A VarSome Clinical instance and the rule selecting the files submitted
+    to it. A file matches when it meets all the criteria given, a route
+    without criteria matches every file.
+
+    :ivar name: The name of the route, recorded in the results.
+    :type name: str
+    :ivar base_url: The base URL of the VarSome Clinical instance.
+    :type base_url: str
+    :ivar token_env: The environment variable holding the API token of the
+        instance. Defaults to "VCLIN_API_TOKEN".
+    :type token_env: str
+    :ivar folder: The folder the files must be in, including its subfolders.
+    :type folder: Optional[str]
+    :ivar name_pattern: Shell style pattern the file names must match.
+    :type name_pattern: Optional[str]
+    :ivar tag: A tag the files must have.
+    :type tag: Optional[str]
+    :ivar properties: Properties the files must have with these values.
+    :type properties: Dict[str, str]
+    :ivar max_rate: The maximum number of files submitted per second,
+        None for no limit.
+    :type max_rate: Optional[float]
+    """
+
+    name: str
+    base_url: str
+    token_env: str = "VCLIN_API_TOKEN"
+    folder: Optional[str] = None
+    name_pattern: Optional[str] = None
+    tag: Optional[str] = None
+    properties: Dict[str, str] = dataclasses.field(default_factory=dict)
+    max_rate: Optional[float] = None
+
+    def matches(self, file: "DXFile") -> bool:
+        if self.folder is not None:
+            folder = self.folder.rstrip("/")
+            if file.folder is None or not (
+                file.folder == folder or file.folder.startswith(f"{folder}/")
+            ):
+                return False
+        if self.name_pattern is not None and not fnmatch.fnmatchcase(
+            file.name, self.name_pattern
+        ):
+            return False
+        if self.tag is not None and self.tag not in file.tags:
+            return False
+        return all(
+            file.properties.get(key) == value for key, value in self.properties.items()
+        )
+
+
+def load_routes(path: str) -> List[Route]:
+    """
+    Loads routes from a JSON file holding a "routes" list of objects with
+    the fields of :class:`Route`.
+
+    :param path: The path of the routes file.
+    :type path: str
+    :return: The routes, in order of precedence.
+    :raises ValueError: If the file does not define valid routes.
+    """
+    with open(path, encoding="utf-8") as fp:
+        try:
+            entries = json.load(fp)["routes"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"{path} does not hold a routes list: {e}") from e
+    routes = []
+    for index, entry in enumerate(entries):
+        try:
+            routes.append(Route(**entry))
+        except TypeError as e:
+            raise ValueError(f"Invalid route {index} in {path}: {e}") from e
+    names = [route.name for route in routes]
+    if duplicates := {name for name in names if names.count(name) > 1}:
+        raise ValueError(f"Duplicate route names in {path}: {sorted(duplicates)}")
+    if not routes:
+        raise ValueError(f"No routes in {path}")
+    return routes
+
+
+def match_route(file: "DXFile", routes: Sequence[Route]) -> Optional[Route]:
+    """
+    Returns the first route the file matches, if any.
+
+    :param file: The file to route.
+    :type file: DXFile
+    :param routes: The routes, in order of precedence.
+    :type routes: Sequence[Route]
+    """
+    return next((route for route in routes if route.matches(file)), None)
+
+
+def route_files(
+    files: Iterable["DXFile"], routes: Sequence[Route]
+) -> Tuple[Dict[str, List["DXFile"]], List["DXFile"]]:
+    """
+    Assigns each file to the first route it matches.
+
+    :param files: The files to route.
+    :type files: Iterable[DXFile]
+    :param routes: The routes, in order of precedence.
+    :type routes: Sequence[Route]
+    :return: The files of each route by route name, and the files matching
+        no route.
+    """
+    routed: Dict[str, List["DXFile"]] = {route.name: [] for route in routes}
+    unrouted = []
+    for file in files:
+        route = match_route(file, routes)
+        if route is None:
+            unrouted.append(file)
+        else:
+            routed[route.name].append(file)
+    return routed, unrouted
+
+
+def merge_results(
+    submissions: Sequence[Callable[[], Iterator["TransferResult"]]],
+) -> Iterator["TransferResult"]:
+    """
+    Runs each submission in its own thread and yields their results as they
+    complete. An error raised by a submission stops the other submissions
+    after their current file, and is raised once the results of all
+    submissions have been yielded.
+
+    :param submissions: Functions returning the results of submitting files
+        to a target as they complete.
+    :type submissions: Sequence[Callable[[], Iterator[TransferResult]]]
+    :return: An iterator over the results of all submissions.
+    """
+    results: queue.SimpleQueue = queue.SimpleQueue()
+    stopped = threading.Event()
+    error: Optional[Exception] = None
+
+    def run(submission: Callable[[], Iterator["TransferResult"]]):
+        try:
+            for result in submission():
+                results.put(result)
+                if stopped.is_set():
+                    break
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(None)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, len(submissions)), thread_name_prefix="dx-vc-route"
+    ) as executor:
+        for submission in submissions:
+            executor.submit(contextvars.copy_context().run, run, submission)
+        try:
+            # Read until every submission is done, so that the results of
+            # the files submitted after an error are not lost.
+            running = len(submissions)
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                elif isinstance(result, Exception):
+                    error = error or result
+                    stopped.set()
+                else:
+                    yield result
+        finally:
+            stopped.set()
+    if error is not None:
+        raise error
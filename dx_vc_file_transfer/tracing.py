@@ -0,0 +1,310 @@
+import contextlib
+import contextvars
+import dataclasses
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "dx_vc_file_transfer_current_span", default=None
+)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """
+    Converts a python value to an OTLP/JSON ``AnyValue``.
+    """
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+@dataclasses.dataclass(kw_only=True)
+class Span:
+    """
+    A single timed operation of a trace.
+
+    :ivar name: The name of the operation.
+    :type name: str
+    :ivar trace_id: Hex encoded 16 byte identifier shared by all spans of a trace.
+    :type trace_id: str
+    :ivar span_id: Hex encoded 8 byte identifier of the span.
+    :type span_id: str
+    :ivar parent_span_id: The span id of the parent span, if any.
+    :type parent_span_id: Optional[str]
+    :ivar kind: The OTLP span kind.
+    :type kind: int
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_time_unix_nano: int = dataclasses.field(default_factory=time.time_ns)
+    end_time_unix_nano: Optional[int] = None
+    attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    events: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+    status_code: int = STATUS_UNSET
+    status_message: Optional[str] = None
+
+    @property
+    def is_recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append(
+            {"name": name, "time": time.time_ns(), "attributes": attributes}
+        )
+
+    def set_status(self, code: int, message: Optional[str] = None):
+        self.status_code = code
+        self.status_message = message
+
+    def record_exception(self, exception: BaseException):
+        self.add_event(
+            "exception",
+            **{
+                "exception.type": type(exception).__name__,
+                "exception.message": str(exception),
+            },
+        )
+        self.set_status(STATUS_ERROR, str(exception))
+
+    def end(self):
+        self.end_time_unix_nano = time.time_ns()
+        if self.status_code == STATUS_UNSET:
+            self.status_code = STATUS_OK
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Returns the span encoded as an OTLP/JSON ``Span`` message.
+        """
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_unix_nano),
+            "endTimeUnixNano": str(self.end_time_unix_nano),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {
+                    "timeUnixNano": str(event["time"]),
+                    "name": event["name"],
+                    "attributes": _otlp_attributes(event["attributes"]),
+                }
+                for event in self.events
+            ],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NonRecordingSpan:
+    """
+    Span handed out when tracing is disabled, all operations are no-ops.
+    """
+
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str, **attributes):
+        pass
+
+    def set_status(self, code: int, message: Optional[str] = None):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+class OTLPJSONFileExporter:
+    """
+    Exports spans to a file using the OTLP/JSON encoding, one
+    ``ExportTraceServiceRequest`` per line. This is the format read by the
+    OpenTelemetry collector ``otlpjsonfile`` receiver. Safe to share between
+    threads, each line is written whole.
+    """
+
+    def __init__(self, path: str, service_name: str = "dx-vc-file-transfer"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "dx_vc_file_transfer"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as fp:
+            fp.write(line)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished spans to an exporter in batches.
+    A tracer without an exporter is disabled and only hands out
+    non-recording spans.
+
+    :param exporter: The exporter finished spans are sent to.
+    :type exporter: Optional[OTLPJSONFileExporter]
+    :param batch_size: Number of finished spans buffered before exporting.
+    :type batch_size: int
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[OTLPJSONFileExporter] = None,
+        batch_size: int = 512,
+    ):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self._finished: List[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextlib.contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """
+        Context manager that times the enclosed block as a span. The span is
+        a child of the span active in the current context, if any. Exceptions
+        raised in the block are recorded on the span and re-raised.
+
+        :param name: The name of the span.
+        :type name: str
+        :param kind: The OTLP span kind.
+        :type kind: int
+        :param attributes: Initial span attributes.
+        """
+        if not self.enabled:
+            yield NON_RECORDING_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self._finished.append(span)
+            if len(self._finished) < self.batch_size:
+                return
+            batch, self._finished = self._finished, []
+        self.exporter.export(batch)
+
+    def shutdown(self):
+        """
+        Exports any buffered spans.
+        """
+        with self._lock:
+            batch, self._finished = self._finished, []
+        if batch and self.exporter is not None:
+            self.exporter.export(batch)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Returns the tracer in use, disabled unless one was installed with
+    :func:`use_tracer`.
+    """
+    return _tracer
+
+
+@contextlib.contextmanager
+def use_tracer(tracer: Tracer) -> Iterator[Tracer]:
+    """
+    Installs a tracer for the duration of the block, exporting the
+    remaining spans on exit.
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+        tracer.shutdown()
+
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    Shortcut for ``get_tracer().span(...)``.
+    """
+    return get_tracer().span(name, kind, **attributes)
+
+
+def current_span() -> "Span":
+    """
+    Returns the span active in the current context, or a non recording span.
+    """
+    return _current_span.get() or NON_RECORDING_SPAN
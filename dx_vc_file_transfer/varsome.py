@@ -1,11 +1,17 @@
 import contextlib
 import dataclasses
-from typing import TYPE_CHECKING, Dict, Optional
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
 
+import requests
+
+from dx_vc_file_transfer import codec, tracing
+from dx_vc_file_transfer.dnanexus import DXFile
 from dx_vc_file_transfer.http_request import http_session
+from dx_vc_file_transfer.results import STATUS_FAILED, TransferResult
 
 if TYPE_CHECKING:
-    import requests
+    from dx_vc_file_transfer.rate_limit import RateLimiter
 
 
 @dataclasses.dataclass(kw_only=True)
@@ -20,17 +26,29 @@ class VarSomeClinicalClient:
     :ivar clinical_base_url: The base URL for the clinical API. Defaults to
         "https://ch.clinical.varsome.com".
     :type clinical_base_url: Optional[str]
+    :ivar http_transport: The HTTP transport used for requests, "requests"
+        or "http2". Defaults to "requests".
+    :type http_transport: str
+    :ivar rate_limiter: Limits the rate at which files are submitted.
+        Defaults to None, which submits files as fast as possible.
+    :type rate_limiter: Optional[RateLimiter]
+    :ivar max_response_size: The maximum size in bytes of a response, larger
+        responses raise ResponseTooLargeError. Defaults to 256 MiB.
+    :type max_response_size: int
     """
 
     clinical_api_token: str
     clinical_base_url: Optional[str] = "https://ch.clinical.varsome.com"
+    http_transport: str = "requests"
+    rate_limiter: Optional["RateLimiter"] = None
+    max_response_size: int = codec.DEFAULT_MAX_RESPONSE_SIZE
 
     @contextlib.contextmanager
     def client(self):
         """
         Context manager to create and manage the HTTP client session.
         """
-        client = http_session(self.clinical_api_token)
+        client = http_session(self.clinical_api_token, transport=self.http_transport)
         try:
             yield client
         finally:
@@ -52,9 +70,10 @@ class VarSomeClinicalClient:
         """
         url = f"{self.clinical_base_url}/api/v1/sample-files/"
         params = {"file_url": file_url, "sample_file_name": file_name}
-        response = client.post(url, json=params)
-        response.raise_for_status()
-        return response.json()
+        with tracing.span("varsome.sample_files", **{"file.name": file_name}) as span:
+            sample_file = codec.post_json(client, url, params, self.max_response_size)
+            span.set_attribute("varsome.sample_file_id", sample_file.get("id"))
+        return sample_file
 
     def retrieve_external_files(self, files: Dict[str, str]) -> Dict[str, Dict]:
         """
@@ -69,3 +88,59 @@ class VarSomeClinicalClient:
                 file_url: self._retrieve_external_file(file_url, file_name, client)
                 for file_url, file_name in files.items()
             }
+
+    def _submit_file(self, file: DXFile, client: "requests.Session") -> TransferResult:
+        """
+        Submit a DNAnexus file to the clinical API. HTTP errors are reported
+        in the returned result, connection errors and timeouts are raised.
+
+        :param file: The file to submit, with its download URL set.
+        :type file: DXFile
+        :param client: The HTTP client session to use for the request.
+        :type client: requests.Session
+        :return: The outcome of the submission.
+        """
+        if not file.url:
+            return TransferResult.for_file(
+                file, status=STATUS_FAILED, error="No download URL"
+            )
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with tracing.span(
+            "transfer_file", **{"dx.file_id": file.file_id, "file.size": file.size}
+        ) as span:
+            start = time.monotonic()
+            try:
+                sample_file = self._retrieve_external_file(file.url, file.name, client)
+            except requests.HTTPError as e:
+                span.record_exception(e)
+                return TransferResult.for_file(
+                    file,
+                    status=STATUS_FAILED,
+                    error=str(e),
+                    submit_latency=time.monotonic() - start,
+                )
+            return TransferResult.for_file(
+                file,
+                sample_file_id=sample_file.get("id"),
+                submit_latency=time.monotonic() - start,
+            )
+
+    def submit_files(self, files: Iterable[DXFile]) -> Iterator[TransferResult]:
+        """
+        Submit DNAnexus files to the clinical API, yielding the outcome of
+        each submission as soon as it completes. The download URL of each
+        file is cleared once submitted, as it grants access to the file and
+        is no longer needed.
+
+        :param files: The files to submit, with their download URLs set.
+        :type files: Iterable[DXFile]
+        :return: An iterator over the outcome of each submission.
+        """
+        with self.client() as client:
+            for file in files:
+                try:
+                    result = self._submit_file(file, client)
+                finally:
+                    file.url = None
+                yield result
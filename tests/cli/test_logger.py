@@ -0,0 +1,106 @@
+import json
+import logging
+import sys
+
+import pytest
+
+from dx_vc_file_transfer.cli.logger import (
+    DebugSampler,
+    JSONFormatter,
+    _get_logger,
+    configure_logging,
+    logger,
+)
+
+
+def test_get_logger_adds_handler_once():
+    handlers = logger.handlers[:]
+    assert _get_logger() is logger
+    assert logger.handlers == handlers
+    assert len(handlers) == 1
+
+
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "dx_vc_file_transfer",
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "Submitted file %s",
+            "args": ("a.vcf",),
+            "created": 0.5,
+            "msecs": 500.0,
+            "file_id": "file-1",
+        }
+    )
+    assert json.loads(JSONFormatter().format(record)) == {
+        "time": "1970-01-01T00:00:00.500Z",
+        "level": "INFO",
+        "logger": "dx_vc_file_transfer",
+        "message": "Submitted file a.vcf",
+        "file_id": "file-1",
+    }
+
+
+def test_json_formatter_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "dx_vc_file_transfer", logging.ERROR, "", 0, "Failed", (), sys.exc_info()
+        )
+    entry = json.loads(JSONFormatter().format(record))
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+@pytest.mark.parametrize(
+    "rate, expected", [(1.0, 10), (0.25, 2), (0.1, 1), (0.3, 3), (0.0, 0)]
+)
+def test_debug_sampler(rate, expected):
+    sampler = DebugSampler(rate)
+    debug = logging.makeLogRecord({"levelno": logging.DEBUG})
+    error = logging.makeLogRecord({"levelno": logging.ERROR})
+    assert sum(sampler.filter(debug) for _ in range(10)) == expected
+    assert sampler.filter(error)
+
+
+def test_configure_logging(capsys):
+    handlers = logger.handlers[:]
+    with configure_logging("json", "DEBUG", debug_sample_rate=0.5):
+        assert logger.level == logging.DEBUG
+        for i in range(4):
+            logger.debug("Submitted file %d", i, extra={"file_id": f"file-{i}"})
+        logger.getChild("hedging").warning("Child %s", "warning")
+    assert logger.handlers == handlers
+    assert logger.level == logging.INFO
+    entries = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert [(e["message"], e.get("file_id")) for e in entries] == [
+        ("Submitted file 1", "file-1"),
+        ("Submitted file 3", "file-3"),
+        ("Child warning", None),
+    ]
+    assert entries[2]["logger"] == "dx_vc_file_transfer.hedging"
+
+
+def test_debug_sampler_does_not_drift():
+    sampler = DebugSampler(0.1)
+    debug = logging.makeLogRecord({"levelno": logging.DEBUG})
+    passed = [i for i in range(1, 1001) if sampler.filter(debug)]
+    assert passed == list(range(10, 1001, 10))
+
+
+@pytest.mark.parametrize("log_format", ["json", "text"])
+def test_configure_logging_exception(capsys, log_format):
+    with configure_logging(log_format, "INFO"):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed to transfer %s", "a.vcf")
+    err = capsys.readouterr().err
+    if log_format == "json":
+        (entry,) = [json.loads(line) for line in err.splitlines()]
+        assert entry["message"] == "Failed to transfer a.vcf"
+        assert "ValueError: boom" in entry["exc_info"]
+    else:
+        assert "Failed to transfer a.vcf" in err
+        assert "ValueError: boom" in err
@@ -0,0 +1,95 @@
+import concurrent.futures
+import os
+import threading
+
+import pytest
+
+from dx_vc_file_transfer.cli import profiling
+
+
+def _busy():
+    return sum(i * i for i in range(20000))
+
+
+@pytest.mark.parametrize(
+    "mode, cpu_file",
+    [
+        ("cprofile", "cpu.prof"),
+        ("sampling", "cpu.folded"),
+    ],
+)
+def test_profile_writes_artifacts(tmp_path, mode, cpu_file):
+    profiler = profiling.Profiler(str(tmp_path), mode=mode, sample_interval=0.001)
+    with profiling.profile(profiler):
+        _busy()
+        profiling.mark_phase("busy")
+    assert [name for name, _ in profiler.snapshots] == ["start", "busy", "end"]
+    assert (tmp_path / cpu_file).exists()
+    assert (tmp_path / "01-busy.tracemalloc").exists()
+    report = (tmp_path / "report.txt").read_text()
+    assert "Top allocation growth up to busy" in report
+    assert "Top functions by" in report
+
+
+@pytest.mark.parametrize(
+    "mode, cpu_file",
+    [
+        ("cprofile", "report.txt"),
+        ("sampling", "cpu.folded"),
+    ],
+)
+def test_profile_covers_worker_threads(tmp_path, mode, cpu_file):
+    def _busy_worker():
+        for _ in range(20):
+            _busy()
+
+    profiler = profiling.Profiler(str(tmp_path), mode=mode, sample_interval=0.001)
+    with profiling.profile(profiler):
+        worker = threading.Thread(target=_busy_worker, name="busy-worker")
+        worker.start()
+        worker.join()
+    output = (tmp_path / cpu_file).read_text()
+    assert "_busy_worker" in output
+    if mode == "sampling":
+        assert "busy-worker;" in output
+
+
+def test_sampling_report_leaves_out_idle_threads_and_profiler(tmp_path):
+    profiler = profiling.Profiler(str(tmp_path), mode="sampling", sample_interval=0.001)
+    with (
+        profiling.profile(profiler),
+        concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        executor.submit(_busy).result()
+        for _ in range(20):
+            _busy()
+    sections = (tmp_path / "report.txt").read_text().split("== ")
+    (functions,) = [s for s in sections if s.startswith("Top functions")]
+    assert "test_profiling.py" in functions
+    assert "_worker" not in functions
+    assert "idle samples left out" in functions
+    assert profiling.__file__ not in "".join(sections)
+
+
+@pytest.mark.parametrize(
+    "function, path, idle",
+    [
+        ("_worker", ("concurrent", "futures", "thread.py"), True),
+        ("dequeue", ("logging", "handlers.py"), True),
+        ("wait", ("threading.py",), True),
+        ("_busy", ("tests", "test_profiling.py"), False),
+        ("wait", ("app", "my_threading.py"), False),
+    ],
+)
+def test_is_idle(function, path, idle):
+    frame = f"{function} ({os.path.join(os.sep, 'lib', *path)}:1)"
+    assert profiling._is_idle(frame) is idle
+
+
+def test_mark_phase_without_profiler_is_noop():
+    profiling.mark_phase("noop")
+
+
+def test_profiler_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        profiling.Profiler(str(tmp_path), mode="unknown")
@@ -0,0 +1,62 @@
+import pathlib
+import subprocess
+import sys
+
+# Best of several runs of the cumulative import time of the CLI module,
+# measured with -X importtime. The modules needed to talk to the APIs are
+# only imported once a transfer starts.
+STARTUP_BUDGET_US = 40_000
+STARTUP_RUNS = 5
+LAZY_MODULES = {
+    "requests",
+    "urllib3",
+    "dx_vc_file_transfer.dnanexus",
+    "dx_vc_file_transfer.varsome",
+    "dx_vc_file_transfer.http_request",
+}
+
+
+def _import_times(code):
+    """
+    Runs the code in a fresh interpreter and returns the cumulative import
+    time in microseconds of each imported module.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=pathlib.Path(__file__).parents[2],
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return process.returncode, times
+
+
+def test_import_does_not_load_api_clients():
+    _, times = _import_times("import dx_vc_file_transfer.cli.transfer_files")
+    assert "dx_vc_file_transfer.cli.transfer_files" in times
+    assert not LAZY_MODULES & times.keys()
+
+
+def test_help_does_not_load_api_clients():
+    returncode, times = _import_times(
+        "import sys; sys.argv = ['dx_to_vclin_transfer', '--help'];"
+        "from dx_vc_file_transfer.cli.transfer_files import main; main()"
+    )
+    assert returncode == 0
+    assert not LAZY_MODULES & times.keys()
+
+
+def test_import_time_budget():
+    best = min(
+        _import_times("import dx_vc_file_transfer.cli.transfer_files")[1][
+            "dx_vc_file_transfer.cli.transfer_files"
+        ]
+        for _ in range(STARTUP_RUNS)
+    )
+    assert best < STARTUP_BUDGET_US
@@ -1,9 +1,20 @@
-from unittest.mock import MagicMock, call, patch
+import json
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
 from requests import ConnectTimeout, HTTPError, ReadTimeout
 
-from dx_vc_file_transfer.cli.transfer_files import _transfer_files, main
+from dx_vc_file_transfer.circuit_breaker import circuit_breakers
+from dx_vc_file_transfer.cli.transfer_files import (
+    _parse_properties,
+    _transfer_files,
+    main,
+)
+from dx_vc_file_transfer.codec import ResponseTooLargeError
+from dx_vc_file_transfer.dnanexus import DXFile
+from dx_vc_file_transfer.http_request import CircuitOpenError
+from dx_vc_file_transfer.results import STATUS_FAILED, TransferResult
+from dx_vc_file_transfer.routing import Route
 
 
 @pytest.fixture
@@ -18,9 +29,7 @@ def mock_config():
 
 @pytest.fixture
 def mock_dx_client():
-    with patch(
-        "dx_vc_file_transfer.cli.transfer_files.DNANexusClient"
-    ) as mock_client_class:
+    with patch("dx_vc_file_transfer.dnanexus.DNANexusClient") as mock_client_class:
         mock_client_instance = MagicMock()
         mock_client_class.return_value = mock_client_instance
         yield mock_client_instance
@@ -29,7 +38,7 @@ def mock_dx_client():
 @pytest.fixture
 def mock_vclin_client():
     with patch(
-        "dx_vc_file_transfer.cli.transfer_files.VarSomeClinicalClient"
+        "dx_vc_file_transfer.varsome.VarSomeClinicalClient"
     ) as mock_client_class:
         mock_client_instance = MagicMock()
         mock_client_class.return_value = mock_client_instance
@@ -51,26 +60,40 @@ def test_transfer_files_success(
     dx_base_url = "https://mock.dnanexus.com"
     accepted_file_extensions = [".mock1", ".mock2"]
     download_expiration = 1234
-    file_urls_names = {
-        "http://download.example.com/file1": "file1.vcf",
-        "http://download.example.com/file2": "file2.vcf.gz",
-    }
-
-    mock_dx_client.files_download_urls_in_project_folder.return_value = file_urls_names
+    files = [
+        DXFile(file_id="file-1", name="file1.vcf"),
+        DXFile(file_id="file-2", name="file2.vcf.gz"),
+    ]
+    results = [
+        TransferResult(file_id="file-1", file_name="file1.vcf", sample_file_id="1"),
+        TransferResult(
+            file_id="file-2",
+            file_name="file2.vcf.gz",
+            status=STATUS_FAILED,
+            error="400 Client Error",
+        ),
+    ]
+
+    mock_dx_client.files_in_project_folder.return_value = files
+    mock_vclin_client.submit_files.return_value = iter(results)
 
     _transfer_files(
         dx_project_id,
-        folder,
+        [folder],
         vclin_base_url,
         dx_base_url,
         accepted_file_extensions,
         download_expiration,
     )
 
-    mock_dx_client.files_download_urls_in_project_folder.assert_called_once_with(
-        dx_project_id, folder
+    dx_session = mock_dx_client.client.return_value.__enter__.return_value
+    mock_dx_client.files_in_project_folder.assert_called_once_with(
+        dx_project_id, folder, dx_session
+    )
+    mock_dx_client.iter_download_urls.assert_called_once_with(files, dx_session)
+    mock_vclin_client.submit_files.assert_called_once_with(
+        mock_dx_client.iter_download_urls.return_value
     )
-    mock_vclin_client.retrieve_external_files.assert_called_once_with(file_urls_names)
 
     mock_logger.info.assert_has_calls(
         [
@@ -79,13 +102,50 @@ def test_transfer_files_success(
                 dx_project_id,
                 folder,
             ),
+            call("Retrieved %d files to transfer to VarSome Clinical", len(files)),
             call(
-                "Retrieved %d files to transfer to VarSome Clinical",
-                len(file_urls_names),
+                "Submitted %d files to VarSome Clinical, %d failed, "
+                "%d duplicates skipped",
+                1,
+                1,
+                0,
             ),
             call("Process to initiate file transfer completed"),
         ]
     )
+    mock_logger.error.assert_called_once_with(
+        "Failed to submit file %s (%s) %s",
+        "file2.vcf.gz",
+        "file-2",
+        "400 Client Error",
+    )
+
+
+def test_transfer_files_writes_results(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger, tmp_path
+):
+    results_file = tmp_path / "results.jsonl"
+    mock_dx_client.files_in_project_folder.return_value = [
+        DXFile(file_id="file-1", name="file1.vcf")
+    ]
+    mock_vclin_client.submit_files.return_value = iter(
+        [TransferResult(file_id="file-1", file_name="file1.vcf", sample_file_id="1")]
+    )
+
+    _transfer_files(
+        "project-123",
+        ["test_folder"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        str(results_file),
+    )
+
+    (record,) = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert record["file_id"] == "file-1"
+    assert record["sample_file_id"] == "1"
+    assert record["status"] == "submitted"
 
 
 def test_transfer_files_no_files(
@@ -98,21 +158,23 @@ def test_transfer_files_no_files(
     accepted_file_extensions = [".mock1", ".mock2"]
     download_expiration = 1234
 
-    mock_dx_client.files_download_urls_in_project_folder.return_value = None
+    mock_dx_client.files_in_project_folder.return_value = []
 
     _transfer_files(
         dx_project_id,
-        folder,
+        [folder],
         vclin_base_url,
         dx_base_url,
         accepted_file_extensions,
         download_expiration,
     )
 
-    mock_dx_client.files_download_urls_in_project_folder.assert_called_once_with(
-        dx_project_id, folder
+    mock_dx_client.files_in_project_folder.assert_called_once_with(
+        dx_project_id,
+        folder,
+        mock_dx_client.client.return_value.__enter__.return_value,
     )
-    mock_vclin_client.retrieve_external_files.assert_not_called()
+    mock_vclin_client.submit_files.assert_not_called()
 
     mock_logger.info.assert_called_once_with(
         "Initiating transfer of files in project %s folder %s", dx_project_id, folder
@@ -124,6 +186,403 @@ def test_transfer_files_no_files(
     )
 
 
+def test_transfer_files_query(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger
+):
+    files = [DXFile(file_id="file-1", name="file1.vcf", project_id="project-456")]
+    mock_dx_client.find_files.return_value = files
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+    mock_vclin_client.submit_files.side_effect = lambda files: (
+        TransferResult(file_id=f.file_id, file_name=f.name, sample_file_id="s")
+        for f in files
+    )
+
+    _transfer_files(
+        "project-123",
+        [],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        tags=["batch1"],
+        properties={"sample_id": "S1"},
+        query_projects=["project-123", "project-456"],
+    )
+
+    dx_session = mock_dx_client.client.return_value.__enter__.return_value
+    mock_dx_client.files_in_project_folder.assert_not_called()
+    mock_dx_client.find_files.assert_called_once_with(
+        ["project-123", "project-456"], ["batch1"], {"sample_id": "S1"}, dx_session
+    )
+    mock_vclin_client.submit_files.assert_called_once()
+    mock_logger.info.assert_any_call(
+        "Initiating transfer of files with tags %s and properties %s in %s",
+        ["batch1"],
+        {"sample_id": "S1"},
+        "projects project-123, project-456",
+    )
+
+
+def test_transfer_files_query_no_files(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger
+):
+    mock_dx_client.find_files.return_value = []
+
+    _transfer_files(
+        "project-123",
+        [],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        tags=["batch1"],
+    )
+
+    mock_vclin_client.submit_files.assert_not_called()
+    mock_logger.info.assert_called_once_with(
+        "Initiating transfer of files with tags %s and properties %s in %s",
+        ["batch1"],
+        {},
+        "all accessible projects",
+    )
+    mock_logger.warning.assert_called_once_with(
+        "No files with tags %s and properties %s found to be transferred",
+        ["batch1"],
+        {},
+    )
+
+
+@pytest.fixture
+def mock_route_clients():
+    clients = {}
+    # Submission functions by base URL, replacing the default one.
+    submit_side_effects = {}
+
+    def client(
+        clinical_api_token,
+        clinical_base_url,
+        http_transport,
+        rate_limiter=None,
+        max_response_size=None,
+    ):
+        vclin_client = MagicMock()
+        vclin_client.submit_files.side_effect = submit_side_effects.get(
+            clinical_base_url,
+            lambda files: (
+                TransferResult(
+                    file_id=f.file_id,
+                    file_name=f.name,
+                    sample_file_id=clinical_base_url,
+                )
+                for f in files
+            ),
+        )
+        clients[clinical_base_url] = (clinical_api_token, rate_limiter, vclin_client)
+        return vclin_client
+
+    with patch(
+        "dx_vc_file_transfer.varsome.VarSomeClinicalClient", side_effect=client
+    ) as mock_vclin_client_class:
+        yield mock_vclin_client_class, clients, submit_side_effects
+
+
+def test_transfer_files_routes(
+    mock_config, mock_dx_client, mock_logger, mock_route_clients, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("VCLIN_EU_API_TOKEN", "eu_token")
+    results_file = tmp_path / "results.jsonl"
+    mock_dx_client.files_in_project_folder.return_value = [
+        DXFile(file_id="file-1", name="a.vcf", properties={"tenant": "eu"}),
+        DXFile(file_id="file-2", name="b.vcf"),
+        DXFile(file_id="file-3", name="c.bam"),
+    ]
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+    routes = [
+        Route(
+            name="eu",
+            base_url="https://eu.varsome.com",
+            token_env="VCLIN_EU_API_TOKEN",
+            properties={"tenant": "eu"},
+            max_rate=5,
+        ),
+        Route(name="ch", base_url="https://ch.varsome.com", name_pattern="*.vcf"),
+    ]
+    _transfer_files(
+        "project-123",
+        ["/"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf", ".bam"],
+        1234,
+        str(results_file),
+        routes=routes,
+    )
+
+    mock_vclin_client_class, clients, _ = mock_route_clients
+    assert mock_vclin_client_class.call_count == 3
+    eu_token, eu_rate_limiter, _ = clients["https://eu.varsome.com"]
+    ch_token, ch_rate_limiter, _ = clients["https://ch.varsome.com"]
+    assert (eu_token, eu_rate_limiter.rate) == ("eu_token", 5)
+    assert ch_rate_limiter is None
+    clients["https://mock.varsome.com"][2].submit_files.assert_not_called()
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert sorted((r["file_id"], r["status"], r["target"]) for r in records) == [
+        ("file-1", "submitted", "eu"),
+        ("file-2", "submitted", "ch"),
+        ("file-3", "failed", None),
+    ]
+    mock_logger.warning.assert_called_once_with("No route matches %d files", 1)
+
+
+def test_transfer_files_route_outage(
+    mock_config, mock_dx_client, mock_logger, mock_route_clients, tmp_path
+):
+    results_file = tmp_path / "results.jsonl"
+    files = [
+        DXFile(file_id=f"file-{i}", name=f"{i}.vcf", properties={"t": t})
+        for i, t in enumerate(["eu", "eu", "eu", "ch", "ch"])
+    ]
+    mock_dx_client.files_in_project_folder.return_value = files
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+
+    def eu_down(files):
+        for file in files:
+            if file.file_id != "file-0":
+                raise CircuitOpenError("Circuit open for host eu")
+            yield TransferResult.for_file(file, sample_file_id="s")
+
+    _, _, submit_side_effects = mock_route_clients
+    submit_side_effects["https://eu"] = eu_down
+    routes = [
+        Route(name="eu", base_url="https://eu", properties={"t": "eu"}),
+        Route(name="ch", base_url="https://ch", properties={"t": "ch"}),
+    ]
+
+    _transfer_files(
+        "project-123",
+        ["/"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        str(results_file),
+        routes=routes,
+    )
+
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert sorted((r["file_id"], r["status"], r["target"]) for r in records) == [
+        ("file-0", "submitted", "eu"),
+        ("file-1", "failed", "eu"),
+        ("file-2", "failed", "eu"),
+        ("file-3", "submitted", "ch"),
+        ("file-4", "submitted", "ch"),
+    ]
+    assert {r["error"] for r in records if r["status"] == "failed"} == {
+        "Circuit open for host eu"
+    }
+    mock_logger.error.assert_any_call(
+        "Host unavailable, stopped submitting %d files to %s %s",
+        2,
+        "eu",
+        ANY,
+    )
+    mock_logger.info.assert_any_call("Process to initiate file transfer completed")
+    # Each route mints download URLs with its own DNAnexus session.
+    assert mock_dx_client.client.call_count == 3
+
+
+def test_transfer_files_route_dnanexus_outage(
+    mock_config, mock_dx_client, mock_logger, mock_route_clients, tmp_path
+):
+    mock_dx_client.files_in_project_folder.return_value = [
+        DXFile(file_id="file-1", name="a.vcf")
+    ]
+    error = CircuitOpenError("Circuit open for host api.dnanexus.com")
+    mock_dx_client.iter_download_urls.side_effect = error
+
+    _transfer_files(
+        "project-123",
+        ["/"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        routes=[Route(name="eu", base_url="https://eu")],
+    )
+
+    mock_logger.error.assert_called_once_with(
+        "Host unavailable, stopped transferring files %s", error
+    )
+
+
+def test_transfer_files_dedup_routes(
+    mock_config, mock_dx_client, mock_logger, mock_route_clients, tmp_path
+):
+    results_file = tmp_path / "results.jsonl"
+    mock_dx_client.files_in_project_folder.return_value = [
+        DXFile(file_id="file-1", name="a.vcf", properties={"md5": "ab", "t": "ch"}),
+        DXFile(file_id="file-2", name="a.vcf", properties={"md5": "ab", "t": "eu"}),
+        DXFile(file_id="file-3", name="b.vcf", properties={"md5": "ab", "t": "eu"}),
+    ]
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+    routes = [
+        Route(name="eu", base_url="https://eu", properties={"t": "eu"}),
+        Route(name="ch", base_url="https://ch", properties={"t": "ch"}),
+    ]
+
+    _transfer_files(
+        "project-123",
+        ["/"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        str(results_file),
+        dedup=True,
+        routes=routes,
+    )
+
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert sorted(
+        (r["file_id"], r["status"], r["alias_of"], r["sample_file_id"], r["target"])
+        for r in records
+    ) == [
+        ("file-1", "submitted", None, "https://ch", "ch"),
+        ("file-2", "submitted", None, "https://eu", "eu"),
+        ("file-3", "duplicate", "file-2", "https://eu", "eu"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content, error",
+    [
+        ('{"routes": []}', "No routes"),
+        (
+            '{"routes": [{"name": "eu", "base_url": "x", "token_env": "NOT_SET"}]}',
+            "API tokens not set in NOT_SET",
+        ),
+    ],
+)
+def test_main_invalid_routes(tmp_path, capsys, content, error):
+    routes_file = tmp_path / "routes.json"
+    routes_file.write_text(content)
+    argv = ["transfer_files", "--dx-project-id", "project-123", "--folder", "/"]
+    with (
+        patch("sys.argv", [*argv, "--routes", str(routes_file)]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+    assert error in capsys.readouterr().err
+
+
+def test_transfer_files_group_by_sample(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger, tmp_path
+):
+    results_file = tmp_path / "results.jsonl"
+    mock_dx_client.files_in_project_folder.return_value = [
+        DXFile(file_id="file-1", name="A_R1.fastq.gz"),
+        DXFile(file_id="file-2", name="B_R1.fastq.gz"),
+        DXFile(file_id="file-3", name="A_R2.fastq.gz"),
+    ]
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+    mock_vclin_client.submit_files.side_effect = lambda files: (
+        TransferResult(file_id=f.file_id, file_name=f.name, sample_file_id="s")
+        for f in files
+    )
+
+    _transfer_files(
+        "project-123",
+        ["/"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".fastq.gz"],
+        1234,
+        str(results_file),
+        group_by_sample=True,
+    )
+
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert [(r["file_id"], r["sample"]) for r in records] == [
+        ("file-1", "A"),
+        ("file-3", "A"),
+        ("file-2", "B"),
+    ]
+    mock_logger.info.assert_any_call(
+        "Grouped %d files into %d samples, %d incomplete", 3, 2, 1
+    )
+    mock_logger.warning.assert_called_once_with(
+        "Sample %s is incomplete, missing %s, submitting it last", "B", "R2"
+    )
+    assert [r["ready_after"] is not None for r in records] == [False, True, False]
+    mock_logger.info.assert_any_call(
+        "Sample %s ready for analysis after %.1f seconds",
+        "A",
+        records[1]["ready_after"],
+        extra={"sample": "A", "ready_after": records[1]["ready_after"]},
+    )
+    summary = [
+        c for c in mock_logger.info.call_args_list if "samples ready" in c.args[0]
+    ]
+    assert [c.args[1:3] for c in summary] == [(1, 2)]
+
+
+@pytest.mark.parametrize(
+    "pattern, error",
+    [("(?P<sample>", "--sample-pattern: missing )"), (r"\w+", "named group sample")],
+)
+def test_main_invalid_sample_pattern(capsys, pattern, error):
+    argv = ["transfer_files", "--dx-project-id", "project-123", "--folder", "/"]
+    with (
+        patch("sys.argv", [*argv, "--sample-pattern", pattern]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+    assert error in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("rate", ["-0.1", "1.5"])
+def test_main_invalid_log_sample_rate(capsys, rate):
+    argv = ["transfer_files", "--dx-project-id", "project-123", "--folder", "/"]
+    with (
+        patch("sys.argv", [*argv, "--log-sample-rate", rate]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+    assert "--log-sample-rate must be between 0 and 1" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("budget", ["0", "-0.1", "5"])
+def test_main_invalid_hedge_budget(capsys, budget):
+    argv = ["transfer_files", "--dx-project-id", "project-123", "--folder", "/"]
+    with (
+        patch("sys.argv", [*argv, "--hedge-budget", budget]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+    assert "--hedge-budget must be greater than 0 and at most 1" in (
+        capsys.readouterr().err
+    )
+
+
+@pytest.mark.parametrize("size", ["0", "-1"])
+def test_main_invalid_max_response_size(capsys, size):
+    argv = ["transfer_files", "--dx-project-id", "project-123", "--folder", "/"]
+    with (
+        patch("sys.argv", [*argv, "--max-response-size", size]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+    assert "--max-response-size must be greater than 0" in capsys.readouterr().err
+
+
+def test_parse_properties():
+    assert _parse_properties(["sample_id=S1", " batch = B 2 ", "run"]) == {
+        "sample_id": "S1",
+        "batch": "B 2",
+        "run": True,
+    }
+
+
 def test_transfer_files_http_error(
     mock_config, mock_dx_client, mock_vclin_client, mock_logger
 ):
@@ -134,13 +593,11 @@ def test_transfer_files_http_error(
     accepted_file_extensions = [".mock1", ".mock2"]
     download_expiration = 1234
 
-    mock_dx_client.files_download_urls_in_project_folder.side_effect = HTTPError(
-        "HTTP Error"
-    )
+    mock_dx_client.files_in_project_folder.side_effect = HTTPError("HTTP Error")
 
     _transfer_files(
         dx_project_id,
-        folder,
+        [folder],
         vclin_base_url,
         dx_base_url,
         accepted_file_extensions,
@@ -149,7 +606,30 @@ def test_transfer_files_http_error(
 
     mock_logger.error.assert_called_once_with(
         "Failed to transfer files %s",
-        mock_dx_client.files_download_urls_in_project_folder.side_effect,
+        mock_dx_client.files_in_project_folder.side_effect,
+    )
+
+
+def test_transfer_files_response_too_large(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger
+):
+    mock_dx_client.files_in_project_folder.side_effect = ResponseTooLargeError(
+        "Response too large"
+    )
+
+    _transfer_files(
+        "project-123",
+        ["test_folder"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".mock1", ".mock2"],
+        1234,
+        max_response_size=1024,
+    )
+
+    mock_logger.error.assert_called_once_with(
+        "Response too large, stopped transferring files %s",
+        mock_dx_client.files_in_project_folder.side_effect,
     )
 
 
@@ -163,13 +643,13 @@ def test_transfer_files_connect_timeout(
     accepted_file_extensions = [".mock1", ".mock2"]
     download_expiration = 1234
 
-    mock_dx_client.files_download_urls_in_project_folder.side_effect = ConnectTimeout(
+    mock_dx_client.files_in_project_folder.side_effect = ConnectTimeout(
         "Connection Timeout"
     )
 
     _transfer_files(
         dx_project_id,
-        folder,
+        [folder],
         vclin_base_url,
         dx_base_url,
         accepted_file_extensions,
@@ -178,7 +658,7 @@ def test_transfer_files_connect_timeout(
 
     mock_logger.error.assert_called_once_with(
         "Timeout error while trying to transfer files %s",
-        mock_dx_client.files_download_urls_in_project_folder.side_effect,
+        mock_dx_client.files_in_project_folder.side_effect,
     )
 
 
@@ -192,13 +672,11 @@ def test_transfer_files_read_timeout(
     accepted_file_extensions = [".mock1", ".mock2"]
     download_expiration = 1234
 
-    mock_dx_client.files_download_urls_in_project_folder.side_effect = ReadTimeout(
-        "Read Timeout"
-    )
+    mock_dx_client.files_in_project_folder.side_effect = ReadTimeout("Read Timeout")
 
     _transfer_files(
         dx_project_id,
-        folder,
+        [folder],
         vclin_base_url,
         dx_base_url,
         accepted_file_extensions,
@@ -207,19 +685,76 @@ def test_transfer_files_read_timeout(
 
     mock_logger.error.assert_called_once_with(
         "Read timeout error while trying to transfer files %s",
-        mock_dx_client.files_download_urls_in_project_folder.side_effect,
+        mock_dx_client.files_in_project_folder.side_effect,
     )
 
 
-def test_main(mock_config, mock_dx_client, mock_vclin_client):
+def test_transfer_files_circuit_open(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger
+):
+    mock_dx_client.files_in_project_folder.side_effect = CircuitOpenError(
+        "Circuit open for host api.dnanexus.com"
+    )
+
+    with patch.object(circuit_breakers, "snapshot") as mock_snapshot:
+        mock_snapshot.return_value = {
+            "api.dnanexus.com": {"state": "open", "opened": 1, "rejected": 4}
+        }
+        _transfer_files(
+            "project-123",
+            ["test_folder"],
+            "https://mock.varsome.com",
+            "https://mock.dnanexus.com",
+            [".vcf"],
+            1234,
+        )
+
+    mock_logger.error.assert_called_once_with(
+        "Host unavailable, stopped transferring files %s",
+        mock_dx_client.files_in_project_folder.side_effect,
+    )
+    mock_logger.warning.assert_called_once_with(
+        "Circuit for host %s opened %d times and rejected %d requests, ending %s",
+        "api.dnanexus.com",
+        1,
+        4,
+        "open",
+    )
+
+
+def test_main(mock_config, mock_dx_client, mock_vclin_client, monkeypatch):
+    monkeypatch.setattr(circuit_breakers, "failure_threshold", 5)
+    monkeypatch.setattr(circuit_breakers, "recovery_timeout", 30.0)
     with patch("argparse.ArgumentParser.parse_args") as mock_parse_args:
         mock_args = MagicMock()
         mock_args.dx_project_id = "project-123"
-        mock_args.folder = "test_folder"
+        mock_args.folder = ["test_folder"]
         mock_args.vclin_base_url = "https://mock.varsome.com"
         mock_args.dx_base_url = "https://mock.dnanexus.com"
         mock_args.accepted_file_extensions = ".mock1,.mock2"
         mock_args.download_expiration = 1234
+        mock_args.results_file = "results.jsonl"
+        mock_args.results_format = "csv"
+        mock_args.dedup = True
+        mock_args.checksum_properties = "md5, sha256"
+        mock_args.http_transport = "http2"
+        mock_args.circuit_failure_threshold = 3
+        mock_args.circuit_recovery_timeout = 10.0
+        mock_args.hedge_budget = 0.05
+        mock_args.tag = None
+        mock_args.property = None
+        mock_args.query_projects = None
+        mock_args.routes = None
+        mock_args.group_samples = True
+        mock_args.sample_pattern = r"(?P<sample>\w+)_R[12]"
+        mock_args.sample_property = "sample_id"
+        mock_args.max_response_size = 16
+        mock_args.single_end = True
+        mock_args.log_format = "json"
+        mock_args.log_level = "DEBUG"
+        mock_args.log_sample_rate = 0.5
+        mock_args.trace_file = None
+        mock_args.profile = None
         mock_parse_args.return_value = mock_args
 
         with patch(
@@ -229,16 +764,129 @@ def test_main(mock_config, mock_dx_client, mock_vclin_client):
 
             mock_transfer.assert_called_once_with(
                 "project-123",
-                "test_folder",
+                ["test_folder"],
                 "https://mock.varsome.com",
                 "https://mock.dnanexus.com",
                 [".mock1", ".mock2"],
                 1234,
+                "results.jsonl",
+                "csv",
+                True,
+                ["md5", "sha256"],
+                "http2",
+                0.05,
+                [],
+                {},
+                ["project-123"],
+                None,
+                True,
+                r"(?P<sample>\w+)_R[12]",
+                "sample_id",
+                16 * 1024 * 1024,
+                False,
             )
+        assert circuit_breakers.failure_threshold == 3
+        assert circuit_breakers.recovery_timeout == 10.0
 
 
 def test_main_argument_parsing():
     with patch("argparse.ArgumentParser.parse_args") as mock_parse_args:
+        mock_parse_args.return_value.circuit_failure_threshold = 5
+        mock_parse_args.return_value.circuit_recovery_timeout = 30.0
+        mock_parse_args.return_value.trace_file = None
+        mock_parse_args.return_value.profile = None
+        mock_parse_args.return_value.tag = None
+        mock_parse_args.return_value.property = None
+        mock_parse_args.return_value.log_format = "text"
+        mock_parse_args.return_value.log_level = "INFO"
+        mock_parse_args.return_value.log_sample_rate = 0.1
+        mock_parse_args.return_value.routes = None
+        mock_parse_args.return_value.sample_pattern = None
+        mock_parse_args.return_value.max_response_size = 256
+        mock_parse_args.return_value.hedge_budget = None
         with patch("dx_vc_file_transfer.cli.transfer_files._transfer_files"):
             main()
             mock_parse_args.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["--tag", "batch1"], (["batch1"], {}, ["project-123"])),
+        (
+            ["--property", "sample_id=S1", "--query-projects", "project-1, project-2"],
+            ([], {"sample_id": "S1"}, ["project-1", "project-2"]),
+        ),
+        (
+            ["--tag", "a", "--tag", "b", "--query-projects", "all"],
+            (["a", "b"], {}, None),
+        ),
+    ],
+)
+def test_main_query(argv, expected):
+    with (
+        patch("sys.argv", ["transfer_files", "--dx-project-id", "project-123", *argv]),
+        patch(
+            "dx_vc_file_transfer.cli.transfer_files._transfer_files"
+        ) as mock_transfer,
+    ):
+        main()
+    args = mock_transfer.call_args.args
+    assert args[1] == []
+    assert args[12:15] == expected
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [[], ["--folder", "/a", "--tag", "batch1"], ["--folder", "/a", "--property", "x"]],
+)
+def test_main_requires_folder_or_query(argv):
+    with (
+        patch("sys.argv", ["transfer_files", "--dx-project-id", "project-123", *argv]),
+        pytest.raises(SystemExit),
+    ):
+        main()
+
+
+def test_transfer_files_dedup(
+    mock_config, mock_dx_client, mock_vclin_client, mock_logger, tmp_path
+):
+    results_file = tmp_path / "results.jsonl"
+    mock_dx_client.files_in_project_folder.side_effect = [
+        [DXFile(file_id="file-1", name="a.vcf", properties={"md5": "abc"})],
+        [
+            DXFile(file_id="file-2", name="b.vcf", properties={"md5": "ABC"}),
+            DXFile(file_id="file-3", name="c.vcf", size=1),
+        ],
+    ]
+    mock_dx_client.iter_download_urls.side_effect = lambda files, session: files
+    mock_vclin_client.submit_files.side_effect = lambda files: (
+        TransferResult(file_id=f.file_id, file_name=f.name, sample_file_id="s")
+        for f in files
+    )
+
+    _transfer_files(
+        "project-123",
+        ["/a", "project-456:/b"],
+        "https://mock.varsome.com",
+        "https://mock.dnanexus.com",
+        [".vcf"],
+        1234,
+        str(results_file),
+        dedup=True,
+    )
+
+    dx_session = mock_dx_client.client.return_value.__enter__.return_value
+    mock_dx_client.files_in_project_folder.assert_has_calls(
+        [
+            call("project-123", "/a", dx_session),
+            call("project-456", "/b", dx_session),
+        ]
+    )
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert [(r["file_id"], r["status"], r["alias_of"]) for r in records] == [
+        ("file-1", "submitted", None),
+        ("file-2", "duplicate", "file-1"),
+        ("file-3", "submitted", None),
+    ]
+    assert records[1]["sample_file_id"] == "s"
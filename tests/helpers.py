@@ -0,0 +1,14 @@
+import json
+from unittest.mock import MagicMock
+
+from dx_vc_file_transfer import codec
+
+
+def json_response(body):
+    response = MagicMock(headers={})
+    response.iter_content.return_value = [json.dumps(body).encode()]
+    return response
+
+
+def json_body(params):
+    return {"data": codec.dumps(params), "headers": codec.JSON_HEADERS, "stream": True}
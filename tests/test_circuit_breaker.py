@@ -0,0 +1,88 @@
+from dx_vc_file_transfer.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _open_breaker(clock):
+    breaker = CircuitBreaker(
+        "example.com", failure_threshold=3, recovery_timeout=10, clock=clock
+    )
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("example.com", failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_closes_circuit():
+    clock = FakeClock()
+    breaker = _open_breaker(clock)
+    clock.now = 10
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = _open_breaker(clock)
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert breaker.opened == 2
+    clock.now = 15
+    assert not breaker.allow_request()
+    clock.now = 20
+    assert breaker.allow_request()
+
+
+def test_registry_creates_one_breaker_per_host():
+    registry = CircuitBreakerRegistry(failure_threshold=1, recovery_timeout=5)
+    breaker = registry.get("a.example.com")
+    assert registry.get("a.example.com") is breaker
+    assert breaker.failure_threshold == 1
+    assert breaker.recovery_timeout == 5
+    registry.get("b.example.com").record_failure()
+    assert registry.snapshot() == {
+        "a.example.com": {
+            "state": STATE_CLOSED,
+            "failures": 0,
+            "opened": 0,
+            "rejected": 0,
+        },
+        "b.example.com": {
+            "state": STATE_OPEN,
+            "failures": 1,
+            "opened": 1,
+            "rejected": 0,
+        },
+    }
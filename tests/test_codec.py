@@ -0,0 +1,108 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from requests import HTTPError
+
+from dx_vc_file_transfer import codec
+
+
+def _response(body: bytes, headers=None, chunk_size=4):
+    response = MagicMock()
+    response.url = "https://mock.dnanexus.com/folder"
+    response.headers = headers or {}
+    chunks = range(0, len(body), chunk_size)
+    response.iter_content.return_value = [body[i:][:chunk_size] for i in chunks]
+    return response
+
+
+def test_dumps_and_loads():
+    obj = {"folder": "/", "describe": {"fields": {"name": True}}, "limit": 1000}
+    data = codec.dumps(obj)
+    assert isinstance(data, bytes)
+    assert b" " not in data
+    assert codec.loads(data) == obj
+    assert codec.BACKEND in ("orjson", "ujson", "json")
+
+
+def test_post_json():
+    client = MagicMock()
+    client.post.return_value = response = _response(b'{"id": "file-1"}')
+
+    assert codec.post_json(client, "https://mock/url", {"a": 1}) == {"id": "file-1"}
+
+    client.post.assert_called_once_with(
+        "https://mock/url",
+        data=codec.dumps({"a": 1}),
+        headers=codec.JSON_HEADERS,
+        stream=True,
+    )
+    response.close.assert_called_once()
+
+
+def test_post_json_content_length_too_large():
+    client = MagicMock()
+    client.post.return_value = response = _response(
+        b'{"id": "file-1"}', headers={"Content-Length": "17"}
+    )
+
+    with pytest.raises(codec.ResponseTooLargeError, match="16 bytes"):
+        codec.post_json(client, "https://mock/url", {}, max_size=16)
+
+    response.iter_content.assert_not_called()
+    response.close.assert_called_once()
+
+
+def test_post_json_streamed_body_too_large():
+    client = MagicMock()
+    client.post.return_value = response = _response(b'{"id": "file-12345"}')
+
+    with pytest.raises(codec.ResponseTooLargeError):
+        codec.post_json(client, "https://mock/url", {}, max_size=16)
+
+    response.close.assert_called_once()
+
+
+def test_post_json_http_error():
+    client = MagicMock()
+    client.post.return_value = response = _response(b"{}")
+    response.raise_for_status.side_effect = HTTPError("HTTP Error")
+
+    with pytest.raises(HTTPError):
+        codec.post_json(client, "https://mock/url", {})
+
+    response.iter_content.assert_not_called()
+    response.close.assert_called_once()
+
+
+def test_body_reader_read_size():
+    reader = codec._BodyReader(_response(b"0123456789", chunk_size=3), max_size=10)
+    assert reader.read(4) == b"0123"
+    assert reader.read(4) == b"4567"
+    assert reader.read() == b"89"
+    assert reader.read(4) == b""
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_post_json_items(incremental):
+    if incremental:
+        pytest.importorskip("ijson")
+    client = MagicMock()
+    client.post.return_value = response = _response(
+        b'{"objects": [{"id": "file-1", "size": 1.5}, {"id": "file-2"}], "next": null}'
+    )
+
+    with patch.object(codec, "ijson", codec.ijson if incremental else None):
+        items = list(codec.post_json_items(client, "https://mock/url", {}, "objects"))
+
+    assert items == [{"id": "file-1", "size": 1.5}, {"id": "file-2"}]
+    response.close.assert_called_once()
+
+
+def test_post_json_items_missing_key():
+    client = MagicMock()
+    client.post.return_value = _response(b'{"next": null}')
+
+    with patch.object(codec, "ijson", None):
+        assert (
+            list(codec.post_json_items(client, "https://mock/url", {}, "objects")) == []
+        )
@@ -0,0 +1,57 @@
+import pytest
+
+from dx_vc_file_transfer.dedup import deduplicate, fingerprint
+from dx_vc_file_transfer.dnanexus import DXFile
+
+
+@pytest.mark.parametrize(
+    "file, expected",
+    [
+        (
+            DXFile(file_id="file-1", name="a.vcf", size=1, properties={"md5": "AB "}),
+            ("checksum", "ab"),
+        ),
+        (
+            DXFile(file_id="file-1", name="a.vcf", properties={"checksum": "cd"}),
+            ("checksum", "cd"),
+        ),
+        (DXFile(file_id="file-1", name="a.vcf", size=1), ("name-size", "a.vcf", 1)),
+        (DXFile(file_id="file-1", name="a.vcf"), ("id", "file-1")),
+    ],
+)
+def test_fingerprint(file, expected):
+    assert fingerprint(file) == expected
+
+
+def test_deduplicate():
+    files = [
+        DXFile(file_id="file-1", name="a.vcf", properties={"md5": "ab"}),
+        DXFile(file_id="file-2", name="b.vcf", size=5),
+        DXFile(file_id="file-3", name="copy.vcf", properties={"md5": "ab"}),
+        DXFile(file_id="file-2", name="b.vcf", project_id="project-2", size=5),
+        DXFile(file_id="file-4", name="b.vcf", size=6),
+    ]
+    unique, aliases = deduplicate(files)
+    assert [f.file_id for f in unique] == ["file-1", "file-2", "file-4"]
+    assert aliases == {"file-1": [files[2]], "file-2": [files[3]]}
+
+
+def test_deduplicate_custom_checksum_properties():
+    files = [
+        DXFile(file_id="file-1", name="a.vcf", properties={"sha256": "ab"}),
+        DXFile(file_id="file-2", name="b.vcf", properties={"sha256": "ab"}),
+    ]
+    unique, aliases = deduplicate(files, ["sha256"])
+    assert [f.file_id for f in unique] == ["file-1"]
+    assert [f.file_id for f in aliases["file-1"]] == ["file-2"]
+
+
+def test_deduplicate_partition():
+    files = [
+        DXFile(file_id="file-1", name="a.vcf", properties={"md5": "ab", "t": "ch"}),
+        DXFile(file_id="file-2", name="a.vcf", properties={"md5": "ab", "t": "eu"}),
+        DXFile(file_id="file-3", name="b.vcf", properties={"md5": "ab", "t": "eu"}),
+    ]
+    unique, aliases = deduplicate(files, partition=lambda f: f.properties["t"])
+    assert [f.file_id for f in unique] == ["file-1", "file-2"]
+    assert aliases == {"file-2": [files[2]]}
@@ -1,21 +1,25 @@
+import time
 from unittest.mock import MagicMock, call, patch
 
 import pytest
 
-from dx_vc_file_transfer.dnanexus import DNANexusClient
+from dx_vc_file_transfer.dnanexus import DESCRIBE_FIELDS, DNANexusClient, DXFile
+from dx_vc_file_transfer.hedging import Hedger
+from tests.helpers import json_body, json_response
 
 
 @pytest.fixture
 def mock_http_session():
     with patch("dx_vc_file_transfer.dnanexus.http_session") as mock_session:
         mock_session.return_value = MagicMock()
+        mock_session.return_value.post.return_value = json_response({})
         yield mock_session
 
 
 def test_client_context_manager(mock_http_session):
     client = DNANexusClient(dx_api_token="test_token", dx_base_url="http://example.com")
     with client.client() as session:
-        mock_http_session.assert_called_once_with("test_token")
+        mock_http_session.assert_called_once_with("test_token", transport="requests")
         session.get("http://example.com")
     session.get.assert_called_once_with("http://example.com")
     session.close.assert_called_once()
@@ -35,11 +39,17 @@ def test_list_folder_files(folder, expected_folder):
     client = DNANexusClient(dx_api_token="test_token", dx_base_url="http://example.com")
     project_id = "project-123"
     with client.client() as session:
-        session.post.return_value.json.return_value = {"objects": []}
+        session.post.return_value = json_response({"objects": []})
         client._list_folder_files(project_id, folder, session)
     session.post.assert_called_once_with(
         f"http://example.com/{project_id}/listFolder",
-        json={"folder": expected_folder, "only": "objects", "describe": True},
+        **json_body(
+            {
+                "folder": expected_folder,
+                "only": "objects",
+                "describe": {"fields": DESCRIBE_FIELDS},
+            }
+        ),
     )
 
 
@@ -51,12 +61,31 @@ def test_filter_files_by_extension():
         accepted_file_extensions=[".vcf", ".vcf.gz"],
     )
     files = [
-        {"id": "file-123", "describe": {"name": "test.vcf"}},
+        {"id": "file-123", "describe": {"name": "test.vcf", "size": 10}},
         {"id": "file-456", "describe": {"name": "test.txt"}},
-        {"id": "file-789", "describe": {"name": "test.vcf.gz"}},
+        {
+            "id": "file-789",
+            "describe": {
+                "name": "test.vcf.gz",
+                "project": "p-1",
+                "folder": "/samples",
+                "tags": ["batch1"],
+                "properties": {"md5": "abc"},
+            },
+        },
     ]
     result = client._filter_files_by_extension(files)
-    assert result == {"file-123": "test.vcf", "file-789": "test.vcf.gz"}
+    assert result == [
+        DXFile(file_id="file-123", name="test.vcf", size=10),
+        DXFile(
+            file_id="file-789",
+            name="test.vcf.gz",
+            project_id="p-1",
+            folder="/samples",
+            tags=["batch1"],
+            properties={"md5": "abc"},
+        ),
+    ]
 
 
 @pytest.mark.usefixtures("mock_http_session")
@@ -68,14 +97,96 @@ def test_file_download_url():
     )
     file_id = "file-123"
     with client.client() as session:
-        session.post.return_value.json.return_value = {
-            "url": "http://download.example.com/file-123"
-        }
+        session.post.return_value = json_response(
+            {"url": "http://download.example.com/file-123"}
+        )
         result = client._file_download_url(file_id, session)
     assert result == "http://download.example.com/file-123"
     session.post.assert_called_once_with(
         f"http://example.com/{file_id}/download",
-        json={"duration": 3600, "preauthenticated": True},
+        **json_body({"duration": 3600, "preauthenticated": True}),
+    )
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_file_download_url_hedged():
+    hedger = Hedger()
+    client = DNANexusClient(
+        dx_api_token="test_token", dx_base_url="http://example.com", hedger=hedger
+    )
+    with client.client() as session:
+        session.post.return_value = json_response({"url": "http://download"})
+        with patch.object(hedger, "call", wraps=hedger.call) as mock_call:
+            assert client._file_download_url("file-123", session) == "http://download"
+    mock_call.assert_called_once()
+    assert mock_call.call_args.kwargs["key"] == "download"
+    session.post.assert_called_once()
+    hedger.close()
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_find_files_pages_through_results():
+    client = DNANexusClient(dx_api_token="test_token", dx_base_url="http://example.com")
+
+    def result(file_id, name):
+        return {
+            "project": "project-1",
+            "id": file_id,
+            "describe": {"name": name, "project": "project-1", "tags": ["batch1"]},
+        }
+
+    pages = [
+        {
+            "results": [result("file-1", "a.vcf"), result("file-2", "a.bam")],
+            "next": {"project": "project-1", "id": "file-3"},
+        },
+        {"results": [result("file-3", "b.vcf.gz")], "next": None},
+    ]
+    with client.client() as session:
+        session.post.side_effect = [json_response(page) for page in pages]
+        files = client.find_files(
+            ["project-1"], ["batch1"], {"sample_id": "S1", "run": True}, session
+        )
+    assert [file.file_id for file in files] == ["file-1", "file-3"]
+    assert files[0].project_id == "project-1"
+    assert files[0].tags == ["batch1"]
+    params = {
+        "class": "file",
+        "state": "closed",
+        "describe": {"fields": DESCRIBE_FIELDS},
+        "limit": 1000,
+        "scope": {"project": "project-1", "folder": "/", "recurse": True},
+        "tags": {"$and": ["batch1"]},
+        "properties": {"sample_id": "S1", "run": True},
+    }
+    assert session.post.call_args_list == [
+        call("http://example.com/system/findDataObjects", **json_body(params)),
+        call(
+            "http://example.com/system/findDataObjects",
+            **json_body(
+                {**params, "starting": {"project": "project-1", "id": "file-3"}}
+            ),
+        ),
+    ]
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_find_files_in_all_projects():
+    client = DNANexusClient(dx_api_token="test_token", dx_base_url="http://example.com")
+    with client.client() as session:
+        session.post.return_value = json_response({"results": [], "next": None})
+        assert client.find_files(None, [], {"batch": "B1"}, session) == []
+    session.post.assert_called_once_with(
+        "http://example.com/system/findDataObjects",
+        **json_body(
+            {
+                "class": "file",
+                "state": "closed",
+                "describe": {"fields": DESCRIBE_FIELDS},
+                "limit": 1000,
+                "properties": {"batch": "B1"},
+            }
+        ),
     )
 
 
@@ -87,10 +198,10 @@ def test_files_download_urls_in_project_folder():
 
     with patch.object(client, "_list_folder_files") as mock_list_files:
         with patch.object(client, "_file_download_url") as mock_download_url:
-            mock_list_files.return_value = {
-                "file-123": "test1.vcf",
-                "file-456": "test2.vcf.gz",
-            }
+            mock_list_files.return_value = [
+                DXFile(file_id="file-123", name="test1.vcf"),
+                DXFile(file_id="file-456", name="test2.vcf.gz"),
+            ]
             mock_download_url.side_effect = [
                 "http://download.example.com/file-123",
                 "http://download.example.com/file-456",
@@ -120,3 +231,23 @@ def test_files_download_urls_in_project_folder_no_files():
             result = client.files_download_urls_in_project_folder(project_id, folder)
     assert result is None
     mock_list_files.assert_called_once()
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_iter_download_urls():
+    client = DNANexusClient(
+        dx_api_token="test_token",
+        dx_base_url="http://example.com",
+        download_expiration=3600,
+    )
+    files = [DXFile(file_id="file-123", name="test1.vcf")]
+    with patch.object(client, "_file_download_url") as mock_download_url:
+        mock_download_url.return_value = "http://download.example.com/file-123"
+        with client.client() as session:
+            minted = client.iter_download_urls(files, session)
+            mock_download_url.assert_not_called()
+            (file,) = list(minted)
+    mock_download_url.assert_called_once_with("file-123", session)
+    assert file.url == "http://download.example.com/file-123"
+    assert file.mint_latency >= 0
+    assert file.url_expires_at > time.time() + 3500
@@ -0,0 +1,137 @@
+import pytest
+
+from dx_vc_file_transfer.dnanexus import DXFile
+from dx_vc_file_transfer.grouping import SampleTracker, group_samples
+from dx_vc_file_transfer.results import STATUS_FAILED, TransferResult
+
+
+def _files(*names, folder="/run1", **kwargs):
+    return [
+        DXFile(file_id=f"file-{name}", name=name, folder=folder, **kwargs)
+        for name in names
+    ]
+
+
+@pytest.mark.parametrize(
+    "name, sample",
+    [
+        ("NA12878_S1_L001_R1_001.fastq.gz", "NA12878"),
+        ("NA12878_L002_R2.fastq.gz", "NA12878"),
+        ("NA12878_R1.fastq.gz", "NA12878"),
+        ("NA12878_1.fq.gz", "NA12878"),
+        ("NA12878.vcf.gz", "NA12878.vcf.gz"),
+    ],
+)
+def test_group_samples_default_pattern(name, sample):
+    (group,) = group_samples(_files(name))
+    assert group.sample == sample
+
+
+def test_group_samples_orders_complete_samples_first():
+    files = _files(
+        "A_S1_L001_R2_001.fastq.gz",
+        "B_S2_L001_R1_001.fastq.gz",
+        "A_S1_L002_R1_001.fastq.gz",
+        "C.vcf.gz",
+        "A_S1_L001_R1_001.fastq.gz",
+        "A_S1_L002_R2_001.fastq.gz",
+    )
+    groups = group_samples(files)
+    assert [(group.sample, group.missing) for group in groups] == [
+        ("A", []),
+        ("C.vcf.gz", []),
+        ("B", ["L001 R2"]),
+    ]
+    assert [file.name for file in groups[0].files] == [
+        "A_S1_L001_R1_001.fastq.gz",
+        "A_S1_L001_R2_001.fastq.gz",
+        "A_S1_L002_R1_001.fastq.gz",
+        "A_S1_L002_R2_001.fastq.gz",
+    ]
+
+
+def test_group_samples_missing_lane():
+    files = _files(
+        "A_L001_R1.fastq.gz",
+        "A_L001_R2.fastq.gz",
+        "A_L003_R1.fastq.gz",
+        "A_L003_R2.fastq.gz",
+    )
+    (group,) = group_samples(files)
+    assert group.missing == ["L002"]
+    assert not group.complete
+
+
+def test_group_samples_lanes_from_first_lane():
+    files = _files(
+        "A_L003_R1.fastq.gz",
+        "A_L003_R2.fastq.gz",
+        "A_L004_R1.fastq.gz",
+        "A_L004_R2.fastq.gz",
+    )
+    (group,) = group_samples(files)
+    assert group.missing == []
+    assert group.complete
+
+
+def test_group_samples_single_end():
+    files = _files("A_L001_R1.fastq.gz", "A_L003_R1.fastq.gz", "B_R1.fastq.gz")
+    groups = group_samples(files, paired=False)
+    assert [(group.sample, group.missing) for group in groups] == [
+        ("B", []),
+        ("A", ["L002"]),
+    ]
+
+
+def test_group_samples_separates_folders():
+    files = _files("A_R1.fastq.gz", folder="/run1") + _files(
+        "A_R2.fastq.gz", folder="/run2"
+    )
+    assert [group.missing for group in group_samples(files)] == [["R2"], ["R1"]]
+
+
+def test_group_samples_by_property():
+    files = _files(
+        "x_R1.fastq.gz", "y_R2.fastq.gz", properties={"sample_id": "S1"}
+    ) + _files("S2.vcf", properties={"sample_id": "S2"})
+    groups = group_samples(files, sample_property="sample_id")
+    assert [(group.sample, len(group.files), group.missing) for group in groups] == [
+        ("S1", 2, []),
+        ("S2", 1, []),
+    ]
+
+
+def test_group_samples_custom_pattern():
+    files = _files("run-A.mate1.fq", "run-A.mate2.fq")
+    (group,) = group_samples(files, r"run-(?P<sample>\w+)\.mate(?P<read>[12])\.fq")
+    assert group.sample == "A"
+    assert group.complete
+
+
+def test_sample_tracker():
+    now = [100.0]
+    groups = group_samples(
+        _files("A_R1.fastq.gz", "A_R2.fastq.gz", "B_R1.fastq.gz", "B_R2.fastq.gz")
+    )
+    tracker = SampleTracker(groups, clock=lambda: now[0])
+
+    def record(file_id, **kwargs):
+        now[0] += 1
+        result = TransferResult(file_id=file_id, file_name=file_id, **kwargs)
+        ready_after = tracker.record(result)
+        assert result.ready_after == ready_after
+        return ready_after, result.sample
+
+    assert record("file-A_R1.fastq.gz") == (None, "A")
+    assert record("file-A_R2.fastq.gz") == (2.0, "A")
+    assert record("file-B_R1.fastq.gz", status=STATUS_FAILED) == (None, "B")
+    assert record("file-B_R2.fastq.gz") == (None, "B")
+    assert record("file-unknown") == (None, None)
+    assert tracker.summary() == {
+        "samples": 2,
+        "ready": 1,
+        "failed": 1,
+        "incomplete": 0,
+        "median_ready_after": 2.0,
+        "max_ready_after": 2.0,
+    }
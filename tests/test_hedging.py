@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from dx_vc_file_transfer import tracing
+from dx_vc_file_transfer.hedging import Hedger
+
+
+@pytest.fixture
+def hedger():
+    hedger = Hedger(budget=1.0, initial_delay=0.01)
+    yield hedger
+    hedger.close()
+
+
+def test_fast_call_is_not_hedged(hedger):
+    assert hedger.call(lambda: "ok") == "ok"
+    assert (hedger.calls, hedger.hedges) == (1, 0)
+
+
+def test_slow_call_is_hedged(hedger):
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    assert hedger.call(fn) == "hedge"
+    release.set()
+    assert (hedger.calls, hedger.hedges, hedger.hedges_won) == (1, 1, 1)
+
+
+def test_budget_caps_hedges():
+    hedger = Hedger(budget=0.5, initial_delay=0)
+    for _ in range(4):
+        hedger.call(lambda: time.sleep(0.01))
+    assert hedger.calls == 4
+    assert hedger.hedges == 2
+    hedger.close()
+
+
+def test_first_slow_call_is_hedged():
+    hedger = Hedger(budget=0.05, initial_delay=0.01)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    assert hedger.call(fn, key="listFolder") == "hedge"
+    release.set()
+    assert (hedger.calls, hedger.hedges) == (1, 1)
+    for _ in range(19):
+        hedger.call(lambda: time.sleep(0.02), key="listFolder")
+    assert hedger.hedges == 1
+    hedger.close()
+
+
+def test_error_raised_when_all_calls_fail(hedger):
+    def fn():
+        time.sleep(0.02)
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError, match="failed"):
+        hedger.call(fn)
+    assert hedger.hedges == 1
+
+
+def test_fast_error_is_not_hedged(hedger):
+    def fn():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        hedger.call(fn)
+    assert hedger.hedges == 0
+
+
+def test_hedge_survives_failed_primary(hedger):
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.02)
+            raise ValueError("failed")
+        time.sleep(0.05)
+        return "hedge"
+
+    assert hedger.call(fn) == "hedge"
+
+
+def test_delay_uses_percentile_of_latencies():
+    hedger = Hedger(initial_delay=2.0, min_delay=0.001, min_samples=20)
+    assert hedger.delay("listFolder") == 2.0
+    hedger._latencies["listFolder"].extend(i / 100 for i in range(1, 101))
+    assert hedger.delay("listFolder") == pytest.approx(0.96)
+    hedger._latencies["listFolder"].clear()
+    hedger._latencies["listFolder"].extend([0.0] * 20)
+    assert hedger.delay("listFolder") == 0.001
+    hedger.close()
+
+
+def test_latencies_are_tracked_per_key():
+    hedger = Hedger(budget=1.0, initial_delay=2.0, min_samples=3)
+    for _ in range(3):
+        hedger.call(lambda: None, key="download")
+    assert len(hedger._latencies["download"]) == 3
+    assert hedger.delay("download") == hedger.min_delay
+    assert hedger.delay("listFolder") == 2.0
+    hedger.close()
+
+
+def test_call_runs_inline_when_it_cannot_be_hedged():
+    hedger = Hedger(budget=0.0)
+    assert hedger.call(threading.get_ident) == threading.get_ident()
+    assert (hedger.calls, hedger.hedges) == (1, 0)
+    hedger.close()
+
+
+def test_running_hedges_are_capped():
+    hedger = Hedger(budget=1.0, initial_delay=0.01, max_hedges=1)
+    release = threading.Event()
+    first = threading.Thread(target=hedger.call, args=(lambda: release.wait(5),))
+    first.start()
+    while hedger.hedges == 0:
+        time.sleep(0.001)
+    assert hedger.call(threading.get_ident) == threading.get_ident()
+    assert hedger.hedges == 1
+    release.set()
+    first.join()
+    hedger.close()
+
+
+def test_calls_run_in_span_context(hedger, tmp_path):
+    exporter = tracing.OTLPJSONFileExporter(str(tmp_path / "trace.jsonl"))
+    with tracing.use_tracer(tracing.Tracer(exporter=exporter)):
+        with tracing.span("parent") as parent:
+            assert hedger.call(tracing.current_span) is parent
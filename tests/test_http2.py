@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+from requests import ConnectionError, ConnectTimeout, HTTPError
+
+from dx_vc_file_transfer import codec
+from dx_vc_file_transfer.circuit_breaker import CircuitBreakerRegistry
+from dx_vc_file_transfer.http_request import CircuitOpenError, http_session
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+from dx_vc_file_transfer.http2 import HTTP2Session  # noqa: E402
+
+
+def _session(handler, **kwargs):
+    session = HTTP2Session({"Authorization": "Bearer token"}, backoff=0, **kwargs)
+    session.client = httpx.Client(
+        transport=httpx.MockTransport(handler), headers=session.headers
+    )
+    return session
+
+
+def test_http_session_http2_transport():
+    session = http_session("token", transport="http2")
+    assert isinstance(session, HTTP2Session)
+    assert session.headers["Authorization"] == "Bearer token"
+    session.close()
+
+
+def test_http_session_unknown_transport():
+    with pytest.raises(ValueError):
+        http_session("token", transport="carrier-pigeon")
+
+
+def test_post_json():
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer token"
+        assert request.content == b'{"folder":"/"}'
+        return httpx.Response(200, json={"objects": []})
+
+    response = _session(handler).post(
+        "http://example.com/listFolder", json={"folder": "/"}
+    )
+    response.raise_for_status()
+    assert response.status_code == 200
+    assert response.json() == {"objects": []}
+
+
+def test_post_json_streamed():
+    def handler(request):
+        assert request.content == b'{"folder":"/"}'
+        return httpx.Response(200, json={"objects": [{"id": "file-1"}]})
+
+    session = _session(handler)
+    assert codec.post_json(
+        session, "http://example.com/listFolder", {"folder": "/"}
+    ) == {"objects": [{"id": "file-1"}]}
+    with pytest.raises(codec.ResponseTooLargeError):
+        codec.post_json(session, "http://example.com/listFolder", {"folder": "/"}, 8)
+
+
+def test_retries_configured_status_codes():
+    responses = iter([httpx.Response(503), httpx.Response(429), httpx.Response(200)])
+    session = _session(lambda request: next(responses))
+    assert session.post("http://example.com/a").status_code == 200
+
+
+def test_raise_for_status_raises_requests_error():
+    session = _session(lambda request: httpx.Response(400), retries=0)
+    with pytest.raises(HTTPError, match="400 Client Error"):
+        session.post("http://example.com/a").raise_for_status()
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (httpx.ConnectTimeout("timeout"), ConnectTimeout),
+        (httpx.ConnectError("refused"), ConnectionError),
+    ],
+)
+def test_transport_errors_are_translated(error, expected):
+    def handler(request):
+        raise error
+
+    with patch("dx_vc_file_transfer.http2.time.sleep") as mock_sleep:
+        with pytest.raises(expected):
+            _session(handler, retries=2).post("http://example.com/a")
+    assert mock_sleep.call_count == 2
+
+
+def test_circuit_breaker_stops_retries():
+    breakers = CircuitBreakerRegistry(failure_threshold=2)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    session = _session(handler, circuit_breakers=breakers)
+    with pytest.raises(CircuitOpenError):
+        session.post("http://example.com/a")
+    with pytest.raises(CircuitOpenError):
+        session.post("http://example.com/a")
+    assert len(calls) == 2
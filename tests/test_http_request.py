@@ -1,8 +1,19 @@
+import socket
 from unittest.mock import MagicMock, patch
 
 import pytest
+from requests import ConnectionError
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import RequestHistory
 
-from dx_vc_file_transfer.http_request import TimeOutSession, http_session
+from dx_vc_file_transfer import tracing
+from dx_vc_file_transfer.circuit_breaker import STATE_OPEN, CircuitBreakerRegistry
+from dx_vc_file_transfer.http_request import (
+    CircuitBreakerRetry,
+    CircuitOpenError,
+    TimeOutSession,
+    http_session,
+)
 
 
 @pytest.mark.parametrize(
@@ -43,19 +54,28 @@ def test_http_session_configures_headers_and_retries(retry_http_codes, expected_
     with (
         patch("dx_vc_file_transfer.http_request.HTTPAdapter") as mock_adapter,
         patch("dx_vc_file_transfer.http_request.TimeOutSession") as mock_session,
-        patch("dx_vc_file_transfer.http_request.Retry") as mock_retry,
+        patch("dx_vc_file_transfer.http_request.CircuitBreakerRetry") as mock_retry,
     ):
         mock_client = MagicMock()
         mock_session.return_value = mock_client
 
-        http_session(token, retries=3, backoff=0.5, retry_http_codes=retry_http_codes)
+        breakers = CircuitBreakerRegistry()
+        http_session(
+            token,
+            retries=3,
+            backoff=0.5,
+            retry_http_codes=retry_http_codes,
+            breakers=breakers,
+        )
 
         mock_retry.assert_called_once_with(
             total=3,
             backoff_factor=0.5,
             status_forcelist=expected_codes,
             allowed_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD"],
+            circuit_breakers=breakers,
         )
+        assert mock_client.circuit_breakers is breakers
         mock_adapter.assert_called_once_with(max_retries=mock_retry.return_value)
         mock_client.headers.update.assert_called_once_with(
             {
@@ -65,3 +85,119 @@ def test_http_session_configures_headers_and_retries(retry_http_codes, expected_
         )
         mock_client.mount.assert_any_call("http://", mock_adapter.return_value)
         mock_client.mount.assert_any_call("https://", mock_adapter.return_value)
+
+
+def test_request_records_span_with_retries():
+    tracer = tracing.Tracer(exporter=MagicMock())
+    session = TimeOutSession()
+    with (
+        tracing.use_tracer(tracer),
+        patch(
+            "dx_vc_file_transfer.http_request.requests.Session.request"
+        ) as mock_request,
+    ):
+        mock_response = MagicMock(status_code=200, content=b"{}")
+        mock_response.raw.retries.history = (
+            RequestHistory("POST", "/listFolder", None, 503, None),
+        )
+        mock_request.return_value = mock_response
+        session.request("POST", "http://example.com/project-1/listFolder")
+    (spans,) = tracer.exporter.export.call_args.args
+    (span,) = spans
+    assert span.name == "HTTP POST"
+    assert span.attributes["server.address"] == "example.com"
+    assert span.attributes["http.response.status_code"] == 200
+    assert span.attributes["http.response.body.size"] == 2
+    assert span.attributes["http.request.resend_count"] == 1
+
+
+def test_request_records_retries_of_failed_request():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    tracer = tracing.Tracer(exporter=MagicMock())
+    session = http_session("token", retries=2, backoff=0, breakers=None)
+    with tracing.use_tracer(tracer), pytest.raises(ConnectionError):
+        session.request("GET", f"http://127.0.0.1:{port}/a")
+    (spans,) = tracer.exporter.export.call_args.args
+    (span,) = spans
+    assert [event["name"] for event in span.events] == ["retry", "retry", "exception"]
+    assert [event["attributes"].get("attempt") for event in span.events[:2]] == [1, 2]
+    assert span.attributes["http.request.resend_count"] == 2
+
+
+def _guarded_session(breakers):
+    session = TimeOutSession()
+    session.circuit_breakers = breakers
+    return session
+
+
+def test_request_fails_fast_when_circuit_open():
+    breakers = CircuitBreakerRegistry(failure_threshold=2, recovery_timeout=60)
+    session = _guarded_session(breakers)
+    with patch(
+        "dx_vc_file_transfer.http_request.requests.Session.request"
+    ) as mock_request:
+        mock_request.return_value = MagicMock(status_code=500)
+        session.request("GET", "http://example.com/a")
+        session.request("GET", "http://example.com/a")
+        with pytest.raises(CircuitOpenError):
+            session.request("GET", "http://example.com/a")
+    assert mock_request.call_count == 2
+    assert breakers.snapshot()["example.com"] == {
+        "state": STATE_OPEN,
+        "failures": 2,
+        "opened": 1,
+        "rejected": 1,
+    }
+
+
+def test_request_converts_errors_when_circuit_opens():
+    breakers = CircuitBreakerRegistry(failure_threshold=1)
+    session = _guarded_session(breakers)
+    with patch(
+        "dx_vc_file_transfer.http_request.requests.Session.request"
+    ) as mock_request:
+
+        def _fail(*args, **kwargs):
+            breakers.get("example.com").record_failure()
+            raise ConnectionError("connection refused")
+
+        mock_request.side_effect = _fail
+        with pytest.raises(CircuitOpenError):
+            session.request("GET", "http://example.com/a")
+
+
+def test_request_closes_circuit_on_success():
+    breakers = CircuitBreakerRegistry()
+    breaker = breakers.get("example.com")
+    breaker.record_failure()
+    session = _guarded_session(breakers)
+    with patch(
+        "dx_vc_file_transfer.http_request.requests.Session.request"
+    ) as mock_request:
+        mock_request.return_value = MagicMock(status_code=404)
+        session.request("GET", "http://example.com/a")
+    assert breaker.failures == 0
+
+
+def test_retry_gives_up_once_circuit_opens():
+    breakers = CircuitBreakerRegistry(failure_threshold=2)
+    retry = CircuitBreakerRetry(total=5, circuit_breakers=breakers)
+    pool = MagicMock(host="example.com")
+    error = ReadTimeoutError(pool, "/a", "read timed out")
+    retry = retry.increment("GET", "/a", error=error, _pool=pool)
+    assert retry.circuit_breakers is breakers
+    with pytest.raises(MaxRetryError):
+        retry.increment("GET", "/a", error=error, _pool=pool)
+    assert breakers.get("example.com").is_open
+
+
+def test_retry_ignores_rate_limiting():
+    breakers = CircuitBreakerRegistry(failure_threshold=1)
+    retry = CircuitBreakerRetry(
+        total=5, status_forcelist=[429], circuit_breakers=breakers
+    )
+    pool = MagicMock(host="example.com")
+    retry.increment("GET", "/a", response=MagicMock(status=429), _pool=pool)
+    assert not breakers.get("example.com").is_open
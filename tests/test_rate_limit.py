@@ -0,0 +1,23 @@
+import pytest
+
+from dx_vc_file_transfer.rate_limit import RateLimiter
+
+
+def test_rate_limiter_spaces_requests():
+    now = [10.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+    assert [limiter.acquire() for _ in range(3)] == [0, 0.25, 0.25]
+    assert sleeps == [0.25, 0.25]
+    now[0] += 1.0
+    assert limiter.acquire() == 0
+
+
+def test_rate_limiter_requires_positive_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+import pytest
+
+from dx_vc_file_transfer.results import (
+    STATUS_FAILED,
+    STATUS_SUBMITTED,
+    ResultSink,
+    TransferResult,
+    open_result_sink,
+)
+
+
+@pytest.fixture
+def results():
+    return [
+        TransferResult(file_id="file-1", file_name="a.vcf", sample_file_id="1"),
+        TransferResult(
+            file_id="file-2", file_name="b.vcf", status=STATUS_FAILED, error="400"
+        ),
+    ]
+
+
+def test_jsonl_sink(results):
+    stream = io.StringIO()
+    sink = ResultSink(stream, "jsonl")
+    for result in results:
+        sink.write(result)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["file_id"] for r in records] == ["file-1", "file-2"]
+    assert records[1]["error"] == "400"
+    assert sink.counts == {STATUS_SUBMITTED: 1, STATUS_FAILED: 1}
+
+
+def test_csv_sink(results):
+    stream = io.StringIO()
+    sink = ResultSink(stream, "csv")
+    for result in results:
+        sink.write(result)
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [r["status"] for r in rows] == [STATUS_SUBMITTED, STATUS_FAILED]
+
+
+def test_sink_without_stream_only_counts(results):
+    with open_result_sink(None) as sink:
+        for result in results:
+            sink.write(result)
+    assert sink.stream is None
+    assert sink.counts[STATUS_FAILED] == 1
+
+
+def test_open_result_sink_stdout(results, capsys):
+    with open_result_sink("-") as sink:
+        sink.write(results[0])
+    assert json.loads(capsys.readouterr().out)["file_id"] == "file-1"
+
+
+def test_sink_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        ResultSink(io.StringIO(), "xml")
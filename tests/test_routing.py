@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+
+import pytest
+
+from dx_vc_file_transfer.dnanexus import DXFile
+from dx_vc_file_transfer.results import TransferResult
+from dx_vc_file_transfer.routing import Route, load_routes, merge_results, route_files
+
+
+def _file(**kwargs):
+    return DXFile(file_id="file-1", name="S1_R1.fastq.gz", folder="/ch/run1", **kwargs)
+
+
+@pytest.mark.parametrize(
+    "criteria, expected",
+    [
+        ({}, True),
+        ({"folder": "/ch"}, True),
+        ({"folder": "/ch/"}, True),
+        ({"folder": "/"}, True),
+        ({"folder": "/c"}, False),
+        ({"name_pattern": "*.fastq.gz"}, True),
+        ({"name_pattern": "*.vcf"}, False),
+        ({"tag": "varsome"}, True),
+        ({"tag": "other"}, False),
+        ({"properties": {"tenant": "ch"}}, True),
+        ({"properties": {"tenant": "eu"}}, False),
+        ({"folder": "/ch", "tag": "other"}, False),
+    ],
+)
+def test_route_matches(criteria, expected):
+    route = Route(name="ch", base_url="https://ch", **criteria)
+    file = _file(tags=["varsome"], properties={"tenant": "ch"})
+    assert route.matches(file) is expected
+
+
+def test_route_files():
+    routes = [
+        Route(name="eu", base_url="https://eu", properties={"tenant": "eu"}),
+        Route(name="ch", base_url="https://ch", folder="/ch"),
+    ]
+    eu = DXFile(
+        file_id="file-1", name="a.vcf", folder="/ch", properties={"tenant": "eu"}
+    )
+    ch = DXFile(file_id="file-2", name="b.vcf", folder="/ch")
+    other = DXFile(file_id="file-3", name="c.vcf", folder="/us")
+    routed, unrouted = route_files([eu, ch, other], routes)
+    assert routed == {"eu": [eu], "ch": [ch]}
+    assert unrouted == [other]
+
+
+def test_load_routes(tmp_path):
+    path = tmp_path / "routes.json"
+    path.write_text(
+        json.dumps(
+            {
+                "routes": [
+                    {
+                        "name": "eu",
+                        "base_url": "https://eu.clinical.varsome.com",
+                        "token_env": "VCLIN_EU_API_TOKEN",
+                        "properties": {"tenant": "eu"},
+                        "max_rate": 5,
+                    },
+                    {"name": "ch", "base_url": "https://ch.clinical.varsome.com"},
+                ]
+            }
+        )
+    )
+    eu, ch = load_routes(str(path))
+    assert eu.token_env == "VCLIN_EU_API_TOKEN"
+    assert eu.max_rate == 5
+    assert ch.token_env == "VCLIN_API_TOKEN"
+
+
+@pytest.mark.parametrize(
+    "content, error",
+    [
+        ("[]", "does not hold a routes list"),
+        ("not json", "does not hold a routes list"),
+        ('{"routes": []}', "No routes"),
+        ('{"routes": [{"name": "ch"}]}', "Invalid route 0"),
+        ('{"routes": [{"name": "ch", "base_url": "x", "token": "y"}]}', "Invalid"),
+        (
+            '{"routes": [{"name": "ch", "base_url": "x"}, {"name": "ch", '
+            '"base_url": "y"}]}',
+            "Duplicate route names",
+        ),
+    ],
+)
+def test_load_routes_invalid(tmp_path, content, error):
+    path = tmp_path / "routes.json"
+    path.write_text(content)
+    with pytest.raises(ValueError, match=error):
+        load_routes(str(path))
+
+
+def _result(file_id):
+    return TransferResult(file_id=file_id, file_name=f"{file_id}.vcf")
+
+
+def test_merge_results_runs_submissions_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def submission(prefix):
+        def submit():
+            for i in range(3):
+                # Both submissions must be running for either to proceed.
+                barrier.wait()
+                yield _result(f"{prefix}-{i}")
+
+        return submit
+
+    results = list(merge_results([submission("eu"), submission("ch")]))
+    assert sorted(r.file_id for r in results) == [
+        "ch-0",
+        "ch-1",
+        "ch-2",
+        "eu-0",
+        "eu-1",
+        "eu-2",
+    ]
+
+
+def test_merge_results_raises_submission_error():
+    submitted = []
+
+    def failing():
+        yield _result("eu-0")
+        raise ConnectionError("down")
+
+    def slow():
+        for i in range(1000):
+            submitted.append(i)
+            time.sleep(0.001)
+            yield _result(f"ch-{i}")
+
+    with pytest.raises(ConnectionError, match="down"):
+        for _ in merge_results([failing, slow]):
+            pass
+    # The other submission stops soon after the error.
+    assert len(submitted) < 1000
+
+
+def test_merge_results_yields_results_completed_after_error():
+    failed = threading.Event()
+
+    def failing():
+        yield _result("eu-0")
+        failed.set()
+        raise ConnectionError("down")
+
+    def healthy():
+        failed.wait(5)
+        # Let the error reach the consumer before this file completes.
+        time.sleep(0.05)
+        yield _result("ch-0")
+        yield _result("ch-1")
+
+    file_ids = []
+    with pytest.raises(ConnectionError, match="down"):
+        for result in merge_results([failing, healthy]):
+            file_ids.append(result.file_id)
+    assert sorted(file_ids) == ["ch-0", "eu-0"]
+
+
+def test_merge_results_without_submissions():
+    assert list(merge_results([])) == []
@@ -0,0 +1,96 @@
+import json
+import threading
+
+import pytest
+
+from dx_vc_file_transfer import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    return tmp_path / "trace.jsonl"
+
+
+def _exported_spans(trace_file):
+    spans = []
+    for line in trace_file.read_text().splitlines():
+        request = json.loads(line)
+        for resource_spans in request["resourceSpans"]:
+            for scope_spans in resource_spans["scopeSpans"]:
+                spans.extend(scope_spans["spans"])
+    return spans
+
+
+def test_disabled_tracer_hands_out_non_recording_spans():
+    tracer = tracing.Tracer()
+    with tracer.span("noop", attempt=1) as span:
+        span.set_attribute("key", "value")
+    assert span is tracing.NON_RECORDING_SPAN
+    assert not span.is_recording
+
+
+def test_span_nesting_and_export(trace_file):
+    tracer = tracing.Tracer(exporter=tracing.OTLPJSONFileExporter(str(trace_file)))
+    with tracing.use_tracer(tracer):
+        with tracing.span("parent", **{"dx.project_id": "project-123"}):
+            with tracing.span("child", tracing.SPAN_KIND_CLIENT) as child:
+                child.set_attribute("http.response.body.size", 42)
+                child.add_event("retry", attempt=1)
+    parent_span, child_span = sorted(
+        _exported_spans(trace_file), key=lambda s: s["name"] != "parent"
+    )
+    assert child_span["traceId"] == parent_span["traceId"]
+    assert child_span["parentSpanId"] == parent_span["spanId"]
+    assert "parentSpanId" not in parent_span
+    assert child_span["kind"] == tracing.SPAN_KIND_CLIENT
+    assert child_span["attributes"] == [
+        {"key": "http.response.body.size", "value": {"intValue": "42"}}
+    ]
+    assert child_span["events"][0]["name"] == "retry"
+    assert parent_span["attributes"] == [
+        {"key": "dx.project_id", "value": {"stringValue": "project-123"}}
+    ]
+    assert parent_span["status"] == {"code": tracing.STATUS_OK}
+    assert tracing.get_tracer() is not tracer
+
+
+def test_span_records_exceptions(trace_file):
+    tracer = tracing.Tracer(exporter=tracing.OTLPJSONFileExporter(str(trace_file)))
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("boom")
+    tracer.shutdown()
+    (span,) = _exported_spans(trace_file)
+    assert span["status"] == {"code": tracing.STATUS_ERROR, "message": "boom"}
+    assert span["events"][0]["name"] == "exception"
+
+
+def test_tracer_exports_in_batches(trace_file):
+    tracer = tracing.Tracer(
+        exporter=tracing.OTLPJSONFileExporter(str(trace_file)), batch_size=2
+    )
+    for _ in range(3):
+        with tracer.span("span"):
+            pass
+    assert len(trace_file.read_text().splitlines()) == 1
+    tracer.shutdown()
+    assert len(trace_file.read_text().splitlines()) == 2
+    assert len(_exported_spans(trace_file)) == 3
+
+
+def test_concurrent_exports_do_not_interleave(trace_file):
+    exporter = tracing.OTLPJSONFileExporter(str(trace_file))
+    tracer = tracing.Tracer(exporter=exporter, batch_size=50)
+
+    def finish_spans():
+        for _ in range(200):
+            with tracer.span("span", payload="x" * 1024):
+                pass
+
+    threads = [threading.Thread(target=finish_spans) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tracer.shutdown()
+    assert len(_exported_spans(trace_file)) == 800
@@ -1,14 +1,19 @@
 from unittest.mock import MagicMock, call, patch
 
 import pytest
+from requests import HTTPError, ReadTimeout
 
+from dx_vc_file_transfer.dnanexus import DXFile
+from dx_vc_file_transfer.results import STATUS_FAILED, STATUS_SUBMITTED
 from dx_vc_file_transfer.varsome import VarSomeClinicalClient
+from tests.helpers import json_body, json_response
 
 
 @pytest.fixture
 def mock_http_session():
     with patch("dx_vc_file_transfer.varsome.http_session") as mock_session:
         mock_session.return_value = MagicMock()
+        mock_session.return_value.post.return_value = json_response({})
         yield mock_session
 
 
@@ -17,7 +22,7 @@ def test_client_context_manager(mock_http_session):
         clinical_api_token="test_token", clinical_base_url="http://example.com"
     )
     with client.client() as session:
-        mock_http_session.assert_called_once_with("test_token")
+        mock_http_session.assert_called_once_with("test_token", transport="requests")
         session.get("http://example.com")
     session.get.assert_called_once_with("http://example.com")
     session.close.assert_called_once()
@@ -34,7 +39,7 @@ def test_retrieve_external_file():
         client._retrieve_external_file(file_url, file_name, session)
     session.post.assert_called_once_with(
         "http://example.com/api/v1/sample-files/",
-        json={"file_url": file_url, "sample_file_name": file_name},
+        **json_body({"file_url": file_url, "sample_file_name": file_name}),
     )
 
 
@@ -53,18 +58,86 @@ def test_retrieve_external_files():
         [
             call(
                 "http://example.com/api/v1/sample-files/",
-                json={
-                    "file_url": "http://server.somewhere.com/file1.txt",
-                    "sample_file_name": "file1",
-                },
+                **json_body(
+                    {
+                        "file_url": "http://server.somewhere.com/file1.txt",
+                        "sample_file_name": "file1",
+                    }
+                ),
             ),
             call(
                 "http://example.com/api/v1/sample-files/",
-                json={
-                    "file_url": "http://server.somewhere.com/file2.txt",
-                    "sample_file_name": "file2",
-                },
+                **json_body(
+                    {
+                        "file_url": "http://server.somewhere.com/file2.txt",
+                        "sample_file_name": "file2",
+                    }
+                ),
             ),
         ],
         any_order=True,
     )
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_submit_files():
+    client = VarSomeClinicalClient(
+        clinical_api_token="test_token", clinical_base_url="http://example.com"
+    )
+    files = [
+        DXFile(
+            file_id="file-1",
+            name="file1.vcf",
+            size=10,
+            url="http://server.somewhere.com/file1",
+            url_expires_at=0,
+        ),
+        DXFile(file_id="file-2", name="file2.vcf", url="http://server/file2"),
+        DXFile(file_id="file-3", name="file3.vcf"),
+    ]
+    with client.client() as session:
+        ok_response = json_response({"id": 42})
+        failed_response = MagicMock()
+        failed_response.raise_for_status.side_effect = HTTPError("400 Client Error")
+        session.post.side_effect = [ok_response, failed_response]
+        results = list(client.submit_files(files))
+    assert [(r.file_id, r.status, r.sample_file_id, r.error) for r in results] == [
+        ("file-1", STATUS_SUBMITTED, 42, None),
+        ("file-2", STATUS_FAILED, None, "400 Client Error"),
+        ("file-3", STATUS_FAILED, None, "No download URL"),
+    ]
+    assert results[0].size == 10
+    assert results[0].url_expires_at == "1970-01-01T00:00:00+00:00"
+    assert results[0].submit_latency >= 0
+    assert session.post.call_count == 2
+    assert [file.url for file in files] == [None, None, None]
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_submit_files_raises_timeouts():
+    client = VarSomeClinicalClient(
+        clinical_api_token="test_token", clinical_base_url="http://example.com"
+    )
+    files = [DXFile(file_id="file-1", name="file1.vcf", url="http://server/file1")]
+    with client.client() as session:
+        session.post.side_effect = ReadTimeout("Read Timeout")
+        with pytest.raises(ReadTimeout):
+            list(client.submit_files(files))
+
+
+@pytest.mark.usefixtures("mock_http_session")
+def test_submit_files_rate_limited():
+    rate_limiter = MagicMock()
+    client = VarSomeClinicalClient(
+        clinical_api_token="test_token",
+        clinical_base_url="http://example.com",
+        rate_limiter=rate_limiter,
+    )
+    files = [
+        DXFile(file_id="file-1", name="file1.vcf", url="http://server/file1"),
+        DXFile(file_id="file-2", name="file2.vcf"),
+    ]
+    with client.client() as session:
+        session.post.return_value = json_response({"id": 42})
+        list(client.submit_files(files))
+    rate_limiter.acquire.assert_called_once_with()